@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .tokens import ClaimsRefreshToken
+
+# Fields the frontend keeps from the login response (AuthContext / Profile)
+LOGIN_USER_FIELDS = ('id', 'username', 'email', 'first_name', 'middle_name', 'last_name',
+                     'is_subscribed', 'subscription_end_date')
+
+
+def find_login_user(identifier):
+    """User matching a username or email, case-insensitively.
+
+    Compares ``LOWER(column)`` so the lookup uses the indexes behind User's
+    case-insensitive unique constraints. If one user's username is another's
+    email, the username match wins.
+    """
+    if not identifier:
+        return None
+    lowered = identifier.lower()
+    candidates = list(
+        get_user_model().objects
+        .alias(username_lower=Lower('username'), email_lower=Lower('email'))
+        .filter(Q(username_lower=lowered) | Q(email_lower=lowered))[:2]
+    )
+    for user in candidates:
+        if user.username.lower() == lowered:
+            return user
+    return candidates[0] if candidates else None
+
+
+def authenticate_login(identifier, password):
+    """The user for these credentials, or None.
+
+    ``check_password`` re-encodes the stored hash when the preferred hasher
+    or its cost settings changed. Unknown users still pay for one hash so
+    response times don't reveal which usernames exist.
+    """
+    user = find_login_user(identifier)
+    if user is None:
+        make_password(password)
+        return None
+    if not user.is_active or not user.check_password(password):
+        return None
+    return user
+
+
+def login_payload(user):
+    """Lean login response: the stored user fields plus a fresh token pair."""
+    refresh = ClaimsRefreshToken.for_user(user)
+    data = {field: getattr(user, field) for field in LOGIN_USER_FIELDS}
+    middle = f' {user.middle_name}' if user.middle_name else ''
+    data['name'] = f'{user.first_name}{middle} {user.last_name}'.strip()
+    return {
+        'user': data,
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+    }
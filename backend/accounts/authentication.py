@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.db import router
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from .tokens import from_timestamp
+
+# Defaults for settings.ACCOUNTS_TOKEN_AUTH
+DEFAULT_TOKEN_AUTH = {
+    'STATELESS_READS': True,  # Build the user from token claims on safe-method requests
+}
+
+
+def get_token_auth_config():
+    return {**DEFAULT_TOKEN_AUTH, **getattr(settings, 'ACCOUNTS_TOKEN_AUTH', {})}
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWT authentication that skips the user query on read requests.
+
+    For safe methods the user is built from the signed claims stamped by
+    accounts.tokens; fields the token doesn't carry are deferred and loaded
+    on first access. Writes, staff tokens, tokens without claims and views
+    setting ``requires_user_row = True`` load the row as before. Claims can
+    be up to one access token lifetime old (refresh re-reads the user).
+    """
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        if self.trusts_claims(request, validated_token):
+            return self.get_token_user(validated_token), validated_token
+        return self.get_user(validated_token), validated_token
+
+    def trusts_claims(self, request, validated_token):
+        if not get_token_auth_config()['STATELESS_READS'] or request.method not in SAFE_METHODS:
+            return False
+        if 'is_subscribed' not in validated_token or validated_token.get('is_staff', True):
+            return False
+        view = (getattr(request, 'parser_context', None) or {}).get('view')
+        return not getattr(view, 'requires_user_row', False)
+
+    def get_token_user(self, validated_token):
+        """A ``User`` with the claimed fields loaded and the rest deferred; no query."""
+        values = {
+            api_settings.USER_ID_FIELD: validated_token[api_settings.USER_ID_CLAIM],
+            'username': validated_token['username'],
+            'is_active': True,
+            'is_staff': False,
+            'is_superuser': False,
+            'is_subscribed': validated_token['is_subscribed'],
+            'subscription_end_date': from_timestamp(validated_token['subscription_end_date']),
+        }
+        field_names = [f.attname for f in self.user_model._meta.concrete_fields if f.attname in values]
+        user = self.user_model.from_db(router.db_for_read(self.user_model), field_names,
+                                       [values[name] for name in field_names])
+        user.subscription_tier_id = validated_token.get('subscription_tier')
+        user.subscription_tier_expires = from_timestamp(validated_token.get('subscription_tier_expires'))
+        return user
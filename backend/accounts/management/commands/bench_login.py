@@ -0,0 +1,79 @@
+import importlib.util
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, get_hasher
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.hashers import get_hashing_config
+from accounts.serializers import UserSerializer
+from accounts.views import UserViewSet
+
+PASSWORD = 'correct horse battery staple'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark password hasher costs and the login endpoint (single core, rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help='Verifications / logins per measurement')
+        parser.add_argument('--pbkdf2-iterations', type=int, nargs='*', default=[],
+                            help='Extra PBKDF2 iteration counts to compare')
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        self.stdout.write(f"{'hasher':<40} {'ms / verify':>12} {'verifies/s':>11}")
+        for label, hasher in self.hashers(options['pbkdf2_iterations']):
+            encoded = hasher.encode(PASSWORD, hasher.salt())
+            elapsed = self.time_it(lambda: hasher.verify(PASSWORD, encoded), repeat)
+            self.stdout.write(f'{label:<40} {elapsed * 1000:>12.1f} {1 / elapsed:>11.1f}')
+
+        self.stdout.write(f"\n{'login path':<40} {'ms / login':>12} {'logins/s':>11}")
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(username='bench-login', email='bench-login@example.com',
+                                                        password=PASSWORD)
+            # What login did before: Django's default PBKDF2, exact lookup, full serializer
+            with override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.PBKDF2PasswordHasher']):
+                user.set_password(PASSWORD)
+                user.save(update_fields=['password'])
+                legacy = self.time_it(lambda: self.legacy_login('bench-login'), repeat)
+            self.stdout.write(f"{'legacy (default PBKDF2)':<40} {legacy * 1000:>12.1f} {1 / legacy:>11.1f}")
+
+            # First current login re-encodes the legacy hash with the preferred hasher
+            view = UserViewSet.as_view({'post': 'login'})
+            factory = APIRequestFactory()
+            login = lambda: view(factory.post('/api/users/login/', {'username': 'BENCH-login', 'password': PASSWORD},
+                                              format='json'))
+            assert login().status_code == 200
+            current = self.time_it(login, repeat)
+            label = f"current ({get_hashing_config()['ALGORITHM']})"
+            self.stdout.write(f'{label:<40} {current * 1000:>12.1f} {1 / current:>11.1f}')
+            transaction.set_rollback(True)
+
+    def hashers(self, extra_iterations):
+        config = get_hashing_config()
+        if importlib.util.find_spec('argon2'):
+            yield (f"argon2id t={config['ARGON2_TIME_COST']} m={config['ARGON2_MEMORY_COST']}KiB "
+                   f"p={config['ARGON2_PARALLELISM']}", get_hasher('argon2'))
+        else:
+            self.stdout.write('argon2-cffi is not installed; skipping Argon2')
+        yield f"pbkdf2_sha256 {config['PBKDF2_ITERATIONS']} iterations", get_hasher('pbkdf2_sha256')
+        for iterations in extra_iterations:
+            hasher = type('BenchPBKDF2PasswordHasher', (PBKDF2PasswordHasher,), {'iterations': iterations})()
+            yield f'pbkdf2_sha256 {iterations} iterations', hasher
+
+    def legacy_login(self, username):
+        user = get_user_model().objects.filter(username=username).first()
+        if user and user.check_password(PASSWORD):
+            refresh = RefreshToken.for_user(user)
+            return {'user': UserSerializer(user).data, 'refresh': str(refresh), 'access': str(refresh.access_token)}
+
+    def time_it(self, func, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - started) / repeat
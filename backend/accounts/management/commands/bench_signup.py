@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIRequestFactory
+
+from accounts.views import UserViewSet
+
+# Hashing dominates a real signup; a trivial hasher isolates the database work
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the registration endpoint: signups/sec and queries per signup (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--signups', type=int, default=200)
+        parser.add_argument('--real-hasher', action='store_true',
+                            help='Hash with the configured PASSWORD_HASHERS instead of a trivial one')
+
+    def handle(self, *args, **options):
+        view = UserViewSet.as_view({'post': 'create'})
+        factory = APIRequestFactory()
+
+        def signup(username, email):
+            data = {'username': username, 'email': email, 'password': 'correct horse battery staple',
+                    'first_name': 'Bench', 'last_name': 'Signup'}
+            return view(factory.post('/api/users/', data, format='json'))
+
+        hashers = {} if options['real_hasher'] else {'PASSWORD_HASHERS': FAST_HASHERS}
+        with override_settings(**hashers), transaction.atomic():
+            count = options['signups']
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                statuses = [signup(f'bench-signup-{i}', f'bench-signup-{i}@example.com').status_code
+                            for i in range(count)]
+                elapsed = time.perf_counter() - started
+            self.report('new users', count, elapsed, len(queries), statuses.count(201))
+
+            # Same emails in different case: every one is rejected by the unique constraint
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                responses = [signup(f'bench-dup-{i}', f'BENCH-SIGNUP-{i}@example.com') for i in range(count)]
+                elapsed = time.perf_counter() - started
+            rejected = sum(1 for r in responses if r.status_code == 400 and 'email' in r.data)
+            self.report('duplicate emails', count, elapsed, len(queries), rejected, expected='rejected')
+            transaction.set_rollback(True)
+
+    def report(self, label, count, elapsed, queries, ok, expected='created'):
+        self.stdout.write(
+            f'{label:<18} {count / elapsed:>9,.0f} signups/sec  {queries / count:>5.1f} queries/signup  '
+            f'{ok}/{count} {expected}'
+        )
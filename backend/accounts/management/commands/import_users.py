@@ -0,0 +1,102 @@
+import csv
+import itertools
+import os
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from accounts.registration import duplicate_field
+
+PROFILE_FIELDS = ('first_name', 'middle_name', 'last_name', 'phone', 'birthdate')
+
+
+def encode_password(value):
+    """Keep hashes exported from another Django install; hash plain text; blank means unusable."""
+    if not value:
+        return make_password(None)
+    try:
+        identify_hasher(value)
+        return value
+    except ValueError:
+        return make_password(value)
+
+
+def profile_values(User, row):
+    values = {}
+    for field in PROFILE_FIELDS:
+        if row.get(field) is not None:
+            values[field] = row[field].strip() or (None if User._meta.get_field(field).null else '')
+    return values
+
+
+class Command(BaseCommand):
+    help = ('Bulk import users from a CSV with username,email[,password,first_name,middle_name,'
+            'last_name,phone,birthdate] columns; duplicates are skipped by the unique constraints')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with a header row')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Users per bulk insert')
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options['path']):
+            raise CommandError(f"No such file: {options['path']}")
+
+        User = get_user_model()
+        created, duplicates = 0, {'username': 0, 'email': 0}
+        started = time.perf_counter()
+        with open(options['path'], newline='', encoding='utf-8') as handle:
+            reader = csv.DictReader(handle)
+            missing = {'username', 'email'} - set(reader.fieldnames or ())
+            if missing:
+                raise CommandError(f"Missing columns: {', '.join(sorted(missing))}")
+
+            while True:
+                rows = list(itertools.islice(reader, options['batch_size']))
+                if not rows:
+                    break
+                users = [
+                    User(
+                        username=User.normalize_username(row['username'].strip()),
+                        email=User.objects.normalize_email(row['email'].strip()),
+                        password=encode_password(row.get('password')),
+                        **profile_values(User, row),
+                    )
+                    for row in rows
+                ]
+                batch_created, batch_duplicates = self.insert(User, users)
+                created += batch_created
+                for field, count in batch_duplicates.items():
+                    duplicates[field] += count
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'{created} created, {created / elapsed:,.0f} users/sec')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {created} users; skipped {duplicates['username']} duplicate usernames "
+            f"and {duplicates['email']} duplicate emails"
+        ))
+
+    def insert(self, User, users):
+        """One INSERT for the batch; only a batch with duplicates falls back to row-by-row savepoints."""
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+            return len(users), {}
+        except IntegrityError:
+            pass
+
+        created, duplicates = 0, {}
+        for user in users:
+            try:
+                with transaction.atomic():
+                    user.save(force_insert=True)
+                created += 1
+            except IntegrityError as err:
+                field = duplicate_field(err)
+                if field is None:
+                    raise
+                duplicates[field] = duplicates.get(field, 0) + 1
+                self.stderr.write(f'Skipped {user.username} <{user.email}>: duplicate {field}')
+        return created, duplicates
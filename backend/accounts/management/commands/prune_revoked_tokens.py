@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import RevokedToken
+from accounts.revocation import get_revocation_store
+
+
+class Command(BaseCommand):
+    help = 'Delete revoked refresh tokens that have expired anyway (safe to run from cron)'
+
+    def handle(self, *args, **options):
+        deleted = get_revocation_store().prune()
+        self.stdout.write(f'Pruned {deleted} expired tokens, {RevokedToken.objects.count()} still revoked')
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.19 on 2026-10-18 15:30
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_user_birthdate_user_middle_name_user_phone_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Lower('username'), name='accounts_user_username_ci_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='accounts_user_email_ci_idx'),
+        ),
+    ]
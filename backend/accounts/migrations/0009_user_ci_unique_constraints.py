@@ -0,0 +1,30 @@
+# Generated by Django 4.2.19 on 2026-10-18 16:45
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='user',
+            name='accounts_user_username_ci_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='user',
+            name='accounts_user_email_ci_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('username'), name='accounts_user_username_ci_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='accounts_user_email_ci_uniq'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.db.models.functions import Lower
 from django.utils import timezone
 
 class User(AbstractUser):
@@ -25,6 +26,14 @@ class User(AbstractUser):
         verbose_name='user permissions',
     )
 
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # Case-insensitive uniqueness; registration relies on these instead of
+            # exists() checks, and login lookups (accounts.auth) use their indexes
+            models.UniqueConstraint(Lower('username'), name='accounts_user_username_ci_uniq'),
+            models.UniqueConstraint(Lower('email'), name='accounts_user_email_ci_uniq'),
+        ]
+
     def __str__(self):
         return self.username
 
@@ -69,3 +78,11 @@ class Subscription(models.Model):
 
     def __str__(self):
         return f"{self.user.username}'s {self.plan.name} subscription"
+
+class RevokedToken(models.Model):
+    """A refresh token jti that may no longer be used, kept only until the token expires."""
+    jti = models.CharField(max_length=255, primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.jti
@@ -0,0 +1,42 @@
+from contextlib import contextmanager
+
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+# Substrings naming each unique constraint in backend error messages: the
+# constraint / index name (PostgreSQL, SQLite expression indexes) or column (SQLite)
+UNIQUE_CONSTRAINTS = {
+    'username': ('accounts_user_username_ci_uniq', 'accounts_user_username_key', 'accounts_user.username'),
+    'email': ('accounts_user_email_ci_uniq', 'accounts_user_email_key', 'accounts_user.email'),
+}
+DUPLICATE_MESSAGES = {
+    'username': 'A user with this username already exists.',
+    'email': 'A user with this email already exists.',
+}
+
+
+def duplicate_field(err):
+    """The User field whose unique constraint ``err`` reports, or None."""
+    message = str(err)
+    for field, markers in UNIQUE_CONSTRAINTS.items():
+        if any(marker in message for marker in markers):
+            return field
+    return None
+
+
+@contextmanager
+def unique_field_errors():
+    """Run the block in a savepoint and report duplicate username / email as field errors.
+
+    Lets writes rely on the database's case-insensitive unique constraints
+    instead of checking with ``exists()`` first, which costs a query per
+    field and still races with concurrent signups.
+    """
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as err:
+        field = duplicate_field(err)
+        if field is None:
+            raise
+        raise serializers.ValidationError({field: [DUPLICATE_MESSAGES[field]]}, code='unique')
@@ -0,0 +1,99 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+# Defaults for settings.ACCOUNTS_TOKEN_REVOCATION
+DEFAULT_TOKEN_REVOCATION = {
+    'CACHE_ALIAS': 'default',
+    'KEY_PREFIX': 'accounts:revoked',
+    'PRUNE_EVERY': 1000,  # Delete expired rows after this many revocations in a process
+}
+
+
+class RevocationStore:
+    """Refresh token jtis that were rotated away or revoked.
+
+    Rows live in RevokedToken only until the token itself expires, so the
+    table is bounded by the tokens issued within one refresh lifetime;
+    expired rows are pruned every ``prune_every`` revocations and by
+    ``manage.py prune_revoked_tokens``. Lookups hit the cache first, then
+    the primary key. ``revoke`` is the atomic check-and-set used on
+    rotation: it returns False when the jti was already revoked.
+    """
+
+    def __init__(self, cache_alias, key_prefix, prune_every):
+        self.cache_alias = cache_alias
+        self.key_prefix = key_prefix
+        self.prune_every = prune_every
+        self._revocations = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        config = {**DEFAULT_TOKEN_REVOCATION, **getattr(settings, 'ACCOUNTS_TOKEN_REVOCATION', {})}
+        return cls(config['CACHE_ALIAS'], config['KEY_PREFIX'], config['PRUNE_EVERY'])
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def key(self, jti):
+        return f'{self.key_prefix}:{jti}'
+
+    def is_revoked(self, jti):
+        if self.cache.get(self.key(jti)):
+            return True
+        row = RevokedToken.objects.filter(jti=jti).values_list('expires_at', flat=True).first()
+        if row is None:
+            # Not cached: a revocation from another worker must be seen immediately
+            return False
+        self._remember(jti, row)
+        return True
+
+    def revoke(self, jti, expires_at):
+        """Revoke ``jti`` until ``expires_at``; False if it was already revoked."""
+        if self.cache.get(self.key(jti)):
+            return False
+        try:
+            with transaction.atomic():
+                RevokedToken.objects.create(jti=jti, expires_at=expires_at)
+        except IntegrityError:
+            return False
+        self._remember(jti, expires_at)
+
+        with self._lock:
+            self._revocations += 1
+            due = self.prune_every and self._revocations % self.prune_every == 0
+        if due:
+            self.prune()
+        return True
+
+    def prune(self):
+        """Delete rows whose token has expired anyway; returns the number removed."""
+        deleted, _ = RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+        if deleted:
+            logger.info(f'Pruned {deleted} expired revoked tokens')
+        return deleted
+
+    def _remember(self, jti, expires_at):
+        ttl = int((expires_at - timezone.now()).total_seconds())
+        if ttl > 0:
+            self.cache.set(self.key(jti), True, ttl)
+
+
+_revocation_store = None
+
+
+def get_revocation_store():
+    global _revocation_store
+    if _revocation_store is None:
+        _revocation_store = RevocationStore.from_settings()
+    return _revocation_store
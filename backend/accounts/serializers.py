@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.contrib.auth.validators import UnicodeUsernameValidator
 from .models import SubscriptionPlan, Subscription
+from .registration import unique_field_errors
 
 User = get_user_model()
 
@@ -10,34 +12,33 @@ class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'username', 'email', 'password', 'first_name', 'middle_name', 'last_name', 'phone', 'birthdate', 'is_subscribed', 'subscription_end_date', 'name')
-        extra_kwargs = {'password': {'write_only': True}, 'is_subscribed': {'read_only': True}, 'subscription_end_date': {'read_only': True}}
+        extra_kwargs = {
+            'password': {'write_only': True},
+            'is_subscribed': {'read_only': True},
+            'subscription_end_date': {'read_only': True},
+            # No UniqueValidator queries: the database constraints decide, see create / update
+            'username': {'validators': [UnicodeUsernameValidator()]},
+            'email': {'validators': []},
+        }
 
     def get_name(self, obj):
         middle = f" {obj.middle_name}" if obj.middle_name else ""
         return f"{obj.first_name}{middle} {obj.last_name}".strip()
 
-    def validate_email(self, value):
-        if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError('A user with this email already exists.')
-        return value
-
-    def validate_username(self, value):
-        if User.objects.filter(username=value).exists():
-            raise serializers.ValidationError('A user with this username already exists.')
-        return value
-
     def create(self, validated_data):
-        try:
-            profile_fields = ['first_name', 'middle_name', 'last_name', 'phone', 'birthdate']
-            user = User.objects.create_user(
+        # One INSERT; duplicates come back from the unique constraints as field errors
+        profile_fields = ['first_name', 'middle_name', 'last_name', 'phone', 'birthdate']
+        with unique_field_errors():
+            return User.objects.create_user(
                 username=validated_data['username'],
                 email=validated_data['email'],
                 password=validated_data['password'],
                 **{field: validated_data.get(field) for field in profile_fields if field in validated_data}
             )
-            return user
-        except Exception as e:
-            raise serializers.ValidationError(str(e))
+
+    def update(self, instance, validated_data):
+        with unique_field_errors():
+            return super().update(instance, validated_data)
 
 class SubscriptionPlanSerializer(serializers.ModelSerializer):
     class Meta:
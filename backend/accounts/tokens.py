@@ -0,0 +1,73 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from rest_framework import exceptions
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from subscriptions.entitlements import get_entitlements
+
+from .revocation import get_revocation_store
+
+
+def to_timestamp(value):
+    return int(value.timestamp()) if value else None
+
+
+def from_timestamp(value):
+    return datetime.fromtimestamp(value, tz=dt_timezone.utc) if value is not None else None
+
+
+def stamp_claims(token, user):
+    """Copy the user's identity and subscription state into the token."""
+    tier_id, tier_expires = get_entitlements().active_tier(user)
+    token['username'] = user.username
+    token['is_staff'] = user.is_staff or user.is_superuser
+    token['is_subscribed'] = bool(user.is_subscribed)
+    token['subscription_end_date'] = to_timestamp(user.subscription_end_date)
+    token['subscription_tier'] = tier_id
+    token['subscription_tier_expires'] = to_timestamp(tier_expires)
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token carrying the user claims; its access tokens copy them."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        stamp_claims(token, user)
+        return token
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Token refresh that re-reads the user and enforces single-use refresh tokens.
+
+    Claims are re-stamped, so they are at most one access lifetime old. With
+    rotation enabled the presented token is revoked in the same step that
+    checks it, so a refresh token can be exchanged only once.
+    """
+
+    token_class = ClaimsRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = get_user_model().objects.filter(
+            **{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]}
+        ).first()
+        if user is None or not user.is_active:
+            raise exceptions.AuthenticationFailed('No active account found for the given token.',
+                                                  code='no_active_account')
+
+        store = get_revocation_store()
+        jti = refresh[api_settings.JTI_CLAIM]
+        if api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION:
+            revoked = not store.revoke(jti, from_timestamp(refresh['exp']))
+        else:
+            revoked = store.is_revoked(jti)
+        if revoked:
+            raise InvalidToken('Token is revoked')
+
+        stamp_claims(refresh, user)
+        return super().validate({**attrs, 'refresh': str(refresh)})
@@ -1,8 +1,9 @@
-from rest_framework import viewsets, status, permissions
+from rest_framework import exceptions, viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
+from .auth import authenticate_login, login_payload
+from .tokens import ClaimsRefreshToken
 from .models import SubscriptionPlan, Subscription
 from .serializers import UserSerializer, SubscriptionPlanSerializer, SubscriptionSerializer
 import logging
@@ -14,6 +15,7 @@ class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    requires_user_row = True  # Profile reads every field; skip the token-claims user
     
     def get_permissions(self):
         if self.action in ['create', 'login']:
@@ -27,7 +29,7 @@ class UserViewSet(viewsets.ModelViewSet):
             
             if serializer.is_valid():
                 user = serializer.save()
-                refresh = RefreshToken.for_user(user)
+                refresh = ClaimsRefreshToken.for_user(user)
                 response_data = {
                     'user': serializer.data,
                     'refresh': str(refresh),
@@ -38,6 +40,10 @@ class UserViewSet(viewsets.ModelViewSet):
             
             logger.error(f"Validation error during registration: {serializer.errors}")
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        except exceptions.ValidationError as e:
+            # Username or email taken, reported by the unique constraints on insert
+            logger.error(f"Validation error during registration: {e.detail}")
+            return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             logger.error(f"Unexpected error during registration: {str(e)}")
             return Response(
@@ -70,18 +76,10 @@ class UserViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['post'])
     def login(self, request):
-        username = request.data.get('username')
-        password = request.data.get('password')
-        user = User.objects.filter(username=username).first()
-
-        if user and user.check_password(password):
-            refresh = RefreshToken.for_user(user)
-            serializer = self.get_serializer(user)
-            return Response({
-                'user': serializer.data,
-                'refresh': str(refresh),
-                'access': str(refresh.access_token),
-            })
+        # Username or email, case-insensitively
+        user = authenticate_login(request.data.get('username'), request.data.get('password') or '')
+        if user is not None:
+            return Response(login_payload(user))
         return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
 
 class SubscriptionPlanViewSet(viewsets.ReadOnlyModelViewSet):
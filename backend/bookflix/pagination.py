@@ -0,0 +1,22 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """Default paging for list endpoints: newest first by primary key.
+
+    Cursors seek on an indexed column, so deep pages cost the same as the
+    first one (no OFFSET scans).
+    """
+    ordering = '-id'
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 100)
+
+
+class LastReadCursorPagination(IdCursorPagination):
+    # id breaks ties between rows read in the same instant
+    ordering = ('-last_read', '-id')
+
+
+class CreatedAtCursorPagination(IdCursorPagination):
+    ordering = ('-created_at', '-id')
@@ -0,0 +1,430 @@
+"""Per-view request profiling, enabled by settings.REQUEST_PROFILING.
+
+ProfilingMiddleware records wall time, database queries, Google Books API
+calls, serializer time and response size for every request into
+in-process histograms keyed by method and URL name. ``/api/metrics/``
+serves them as Prometheus text (or JSON with ``?format=json``) together
+with the counters the search cache, upstream guard, catalog refresher and
+progress buffer already keep. A sample of requests runs under cProfile and
+the slowest captures are served by ``/api/metrics/profiles/``. All numbers
+are per worker process.
+"""
+import bisect
+import cProfile
+import contextvars
+import functools
+import heapq
+import hmac
+import io
+import itertools
+import logging
+import pstats
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Defaults for settings.REQUEST_PROFILING
+DEFAULT_REQUEST_PROFILING = {
+    'ENABLED': False,
+    'SLOW_REQUEST_SECONDS': 1.0,  # Log a breakdown for requests slower than this (0 disables)
+    'PROFILE_SAMPLE_RATE': 0.01,  # Share of sync requests run under cProfile
+    'PROFILE_KEEP': 20,  # Slowest sampled profiles kept
+    'PROFILE_LINES': 40,  # Functions listed per profile, by cumulative time
+    'METRICS_TOKEN': '',  # X-Metrics-Token for scrapers; staff sessions and DEBUG need none
+}
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+BYTE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# Histogram name -> (help text, bucket upper bounds)
+METRICS = {
+    'request_seconds': ('Wall time per request', TIME_BUCKETS),
+    'db_queries': ('Database queries per request', COUNT_BUCKETS),
+    'db_seconds': ('Time spent in database queries per request', TIME_BUCKETS),
+    'upstream_calls': ('Google Books API calls per request', COUNT_BUCKETS),
+    'upstream_seconds': ('Time spent in Google Books API calls per request', TIME_BUCKETS),
+    'serializer_seconds': ('Time spent in serializer .data per request, queries included', TIME_BUCKETS),
+    'response_bytes': ('Response body size', BYTE_BUCKETS),
+}
+
+
+def get_profiling_config():
+    return {**DEFAULT_REQUEST_PROFILING, **getattr(settings, 'REQUEST_PROFILING', {})}
+
+
+class RequestStats:
+    """Counters for the request being handled; shared with sync_to_async threads through a contextvar."""
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.upstream_calls = 0
+        self.upstream_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializer_depth = 0
+
+
+_current = contextvars.ContextVar('request_stats', default=None)
+
+
+@contextmanager
+def upstream_call():
+    """Time a Google Books API call for the current request, if it is being profiled."""
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.upstream_calls += 1
+        stats.upstream_seconds += time.perf_counter() - started
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+def install_query_wrapper(connection, **kwargs):
+    # Every thread has its own connection, so hook each one as it opens
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def timed_data(fget):
+    @functools.wraps(fget)
+    def data(self):
+        stats = _current.get()
+        if stats is None or stats.serializer_depth:
+            return fget(self)
+        stats.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return fget(self)
+        finally:
+            stats.serializer_depth -= 1
+            stats.serializer_seconds += time.perf_counter() - started
+
+    data.profiled = True
+    return data
+
+
+def install():
+    """Hook database connections and DRF serializers (idempotent)."""
+    from rest_framework import serializers
+
+    connection_created.connect(install_query_wrapper, dispatch_uid='bookflix.profiling')
+    for connection in connections.all(initialized_only=True):
+        install_query_wrapper(connection)
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        fget = cls.__dict__['data'].fget
+        if not getattr(fget, 'profiled', False):
+            cls.data = property(timed_data(fget))
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        cumulative = list(itertools.accumulate(self.counts))
+        return {
+            'buckets': dict(zip([*map(str, self.buckets), '+Inf'], cumulative)),
+            'count': self.count,
+            'sum': self.sum,
+            'p50': self.quantile(cumulative, 0.5),
+            'p95': self.quantile(cumulative, 0.95),
+            'p99': self.quantile(cumulative, 0.99),
+        }
+
+    def quantile(self, cumulative, q):
+        """Upper bound of the bucket holding the q-quantile (None past the last bound)."""
+        if not self.count:
+            return None
+        index = bisect.bisect_left(cumulative, q * self.count)
+        return self.buckets[index] if index < len(self.buckets) else None
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._views = defaultdict(lambda: {name: Histogram(buckets) for name, (_, buckets) in METRICS.items()})
+        self._lock = threading.Lock()
+
+    def record(self, method, view, elapsed, stats, size):
+        values = {
+            'request_seconds': elapsed,
+            'db_queries': stats.db_queries,
+            'db_seconds': stats.db_seconds,
+            'upstream_calls': stats.upstream_calls,
+            'upstream_seconds': stats.upstream_seconds,
+            'serializer_seconds': stats.serializer_seconds,
+            'response_bytes': size,
+        }
+        with self._lock:
+            histograms = self._views[(method, view)]
+            for name, value in values.items():
+                if value is not None:
+                    histograms[name].observe(value)
+
+    def snapshot(self):
+        """{(method, view): {metric: histogram snapshot}}"""
+        with self._lock:
+            return {
+                key: {name: histogram.snapshot() for name, histogram in histograms.items()}
+                for key, histograms in self._views.items()
+            }
+
+
+class ProfileStore:
+    """Runs a sample of requests under cProfile and keeps the slowest captures.
+
+    Only one request is profiled at a time, and only on the sync path: on
+    the event loop a profiler would also capture every other coroutine.
+    """
+
+    def __init__(self, sample_rate, keep, lines):
+        self.sample_rate = sample_rate
+        self.keep = keep
+        self.lines = lines
+        self._heap = []  # (seconds, seq, entry), fastest first
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._active = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        config = get_profiling_config()
+        return cls(config['PROFILE_SAMPLE_RATE'], config['PROFILE_KEEP'], config['PROFILE_LINES'])
+
+    def start(self):
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return None
+        if not self._active.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (a debugger, or cProfile run on the server) owns the hook
+            self._active.release()
+            return None
+        return profiler
+
+    def finish(self, profiler, label, elapsed):
+        profiler.disable()
+        self._active.release()
+        with self._lock:
+            if len(self._heap) >= self.keep and elapsed <= self._heap[0][0]:
+                return
+
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(self.lines)
+        entry = {'request': label, 'seconds': elapsed, 'captured_at': timezone.now().isoformat(),
+                 'profile': output.getvalue()}
+        with self._lock:
+            item = (elapsed, next(self._seq), entry)
+            if len(self._heap) < self.keep:
+                heapq.heappush(self._heap, item)
+            elif elapsed > self._heap[0][0]:
+                heapq.heapreplace(self._heap, item)
+
+    def slowest(self):
+        with self._lock:
+            return [entry for _, _, entry in sorted(self._heap, key=lambda item: item[0], reverse=True)]
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match._func_path
+
+
+def response_size(response):
+    if not response.streaming:
+        return len(response.content)
+    length = response.get('Content-Length')
+    return int(length) if length else None
+
+
+class ProfilingMiddleware:
+    """Records per-view timings into the registry; removed from the stack when disabled."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = get_profiling_config()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_request_seconds = config['SLOW_REQUEST_SECONDS']
+        self.registry = get_registry()
+        self.profiles = get_profile_store()
+        install()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        profiler = self.profiles.start()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            elapsed = time.perf_counter() - started
+            if profiler is not None:
+                self.profiles.finish(profiler, f'{request.method} {request.get_full_path()}', elapsed)
+            _current.reset(token)
+        self.record(request, response, stats, elapsed)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+        self.record(request, response, stats, elapsed)
+        return response
+
+    def record(self, request, response, stats, elapsed):
+        view = view_name(request)
+        self.registry.record(request.method, view, elapsed, stats, response_size(response))
+        if self.slow_request_seconds and elapsed >= self.slow_request_seconds:
+            logger.warning(
+                f'Slow request {request.method} {view}: {elapsed:.3f}s, '
+                f'{stats.db_queries} queries ({stats.db_seconds:.3f}s), '
+                f'{stats.upstream_calls} upstream calls ({stats.upstream_seconds:.3f}s), '
+                f'serializers {stats.serializer_seconds:.3f}s'
+            )
+
+
+def module_stats():
+    """Counters the caching / refresh subsystems already keep, sampled at export time."""
+    from books.progress import get_progress_buffer
+    from googlebooks.cache import get_search_cache
+    from googlebooks.guard import get_upstream_guard
+    from googlebooks.refresh import CatalogRefresher
+
+    stats = {
+        'search_cache': get_search_cache().stats(),
+        'upstream_guard': get_upstream_guard().stats(),
+        'catalog_refresh': {'lag_seconds': CatalogRefresher.from_settings().refresh_lag()},
+    }
+    progress_buffer = get_progress_buffer()
+    if progress_buffer is not None:
+        stats['progress_buffer'] = progress_buffer.stats()
+    return stats
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text(snapshot, modules):
+    lines = []
+    for name, (help_text, _) in METRICS.items():
+        metric = f'bookflix_{name}'
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} histogram']
+        for (method, view), histograms in sorted(snapshot.items()):
+            histogram = histograms[name]
+            labels = f'method="{method}",view="{escape_label(view)}"'
+            for bound, count in histogram['buckets'].items():
+                lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f"{metric}_sum{{{labels}}} {histogram['sum']}")
+            lines.append(f"{metric}_count{{{labels}}} {histogram['count']}")
+
+    for source, values in modules.items():
+        for key, value in values.items():
+            metric = f'bookflix_{source}_{key}'
+            lines.append(f'# TYPE {metric} gauge')
+            if isinstance(value, str):
+                lines.append(f'{metric}{{value="{escape_label(value)}"}} 1')
+            else:
+                lines.append(f'{metric} {float(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def can_read_metrics(request):
+    token = get_profiling_config()['METRICS_TOKEN']
+    if token and hmac.compare_digest(request.headers.get('X-Metrics-Token', ''), token):
+        return True
+    user = getattr(request, 'user', None)
+    return settings.DEBUG or bool(user and user.is_staff)
+
+
+def metrics_view(request):
+    if not can_read_metrics(request):
+        return JsonResponse({'detail': 'Not allowed to read metrics.'}, status=403)
+    snapshot = get_registry().snapshot()
+    modules = module_stats()
+    if request.GET.get('format') == 'json':
+        views = [
+            {'method': method, 'view': view, **histograms}
+            for (method, view), histograms in sorted(snapshot.items())
+        ]
+        return JsonResponse({'views': views, 'modules': modules})
+    return HttpResponse(prometheus_text(snapshot, modules), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def profiles_view(request):
+    if not can_read_metrics(request):
+        return JsonResponse({'detail': 'Not allowed to read metrics.'}, status=403)
+    return JsonResponse({'profiles': get_profile_store().slowest()})
+
+
+_registry = None
+_profile_store = None
+
+
+def get_registry():
+    global _registry
+    if _registry is None:
+        _registry = MetricsRegistry()
+    return _registry
+
+
+def get_profile_store():
+    global _profile_store
+    if _profile_store is None:
+        _profile_store = ProfileStore.from_settings()
+    return _profile_store
@@ -0,0 +1,72 @@
+from rest_framework import serializers
+
+from books.progress import get_progress_buffer
+
+
+class LibraryStateListSerializer(serializers.ListSerializer):
+    """Prefetches the requesting user's favorites and progress for a whole page at once."""
+
+    def to_representation(self, data):
+        items = list(data.all() if hasattr(data, 'all') else data)
+        self.child.prefetch_library_state(items)
+        return super().to_representation(items)
+
+
+class LibraryStateMixin:
+    """Resolves is_favorited / reading_progress from a per-request map kept in the context.
+
+    The map is filled with two queries per batch of books instead of two
+    queries per book; books not prefetched yet are loaded on first access.
+    Progress still waiting in the progress buffer overrides stored values.
+    """
+    favorite_model = None
+    history_model = None
+    library_catalog = None
+
+    def _library_user(self):
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            return request.user
+        return None
+
+    def _library_state(self):
+        key = f'library_state:{self.favorite_model._meta.label_lower}'
+        return self.context.setdefault(key, {'book_ids': set(), 'favorites': set(), 'progress': {}})
+
+    def prefetch_library_state(self, books):
+        user = self._library_user()
+        if user is None:
+            return
+        state = self._library_state()
+        book_ids = {book.pk for book in books} - state['book_ids']
+        if not book_ids:
+            return
+        state['favorites'].update(
+            self.favorite_model.objects.filter(user=user, book_id__in=book_ids).values_list('book_id', flat=True)
+        )
+        state['progress'].update(
+            self.history_model.objects.filter(user=user, book_id__in=book_ids).values_list('book_id', 'progress')
+        )
+        progress_buffer = get_progress_buffer()
+        if progress_buffer is not None:
+            state['progress'].update(progress_buffer.pending(self.library_catalog, user.pk, book_ids))
+        state['book_ids'].update(book_ids)
+
+    def get_is_favorited(self, obj):
+        if self._library_user() is None:
+            return False
+        self.prefetch_library_state([obj])
+        return obj.pk in self._library_state()['favorites']
+
+    def get_reading_progress(self, obj):
+        if self._library_user() is None:
+            return 0
+        self.prefetch_library_state([obj])
+        return self._library_state()['progress'].get(obj.pk, 0)
+
+
+class NestedLibraryStateMixin:
+    """For favorite / history rows: prefetch library state for the nested ``book`` field."""
+
+    def prefetch_library_state(self, items):
+        self.fields['book'].prefetch_library_state([item.book for item in items])
@@ -1,5 +1,6 @@
 """Django settings for bookflix project."""
 from pathlib import Path
+import importlib.util
 import os
 from dotenv import load_dotenv
 from datetime import timedelta
@@ -35,6 +36,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'bookflix.profiling.ProfilingMiddleware',  # Outermost so it times the whole stack; off unless enabled
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -89,6 +91,33 @@ AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',},
 ]
 
+# Password hashing cost (see accounts/hashers.py and manage.py bench_login). Argon2 is
+# used when argon2-cffi is installed; stored hashes are upgraded on the next login.
+ACCOUNTS_PASSWORD_HASHING = {
+    'ALGORITHM': os.environ.get(
+        'PASSWORD_HASHER', 'argon2' if importlib.util.find_spec('argon2') else 'pbkdf2'
+    ),
+    'PBKDF2_ITERATIONS': int(os.environ.get('PBKDF2_ITERATIONS', 600000)),
+    'ARGON2_TIME_COST': 2,
+    'ARGON2_MEMORY_COST': 19 * 1024,
+    'ARGON2_PARALLELISM': 1,
+}
+
+_PREFERRED_HASHER = {
+    'argon2': 'accounts.hashers.TunedArgon2PasswordHasher',
+    'pbkdf2': 'accounts.hashers.TunedPBKDF2PasswordHasher',
+}[ACCOUNTS_PASSWORD_HASHING['ALGORITHM']]
+# The rest verify existing hashes until they are re-encoded
+PASSWORD_HASHERS = list(dict.fromkeys([
+    _PREFERRED_HASHER,
+    'accounts.hashers.TunedPBKDF2PasswordHasher',
+    'accounts.hashers.TunedArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]))
+
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
 USE_I18N = True
@@ -101,19 +130,38 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.ClaimsJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'bookflix.pagination.IdCursorPagination',
+    'PAGE_SIZE': 20,
 }
 
+# Upper bound for the ?page_size= query parameter on paginated endpoints
+API_MAX_PAGE_SIZE = 100
+
 # JWT settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.tokens.ClaimsTokenRefreshSerializer',
+}
+
+# Read requests authenticate from the access token's claims without a user query
+# (see accounts/authentication.py); set False to always load the user row
+ACCOUNTS_TOKEN_AUTH = {
+    'STATELESS_READS': os.environ.get('ACCOUNTS_STATELESS_READS', 'true').lower() == 'true',
+}
+
+# Rotated refresh tokens are revoked until they expire (accounts/revocation.py), so
+# each one can be used once; prune with manage.py prune_revoked_tokens
+ACCOUNTS_TOKEN_REVOCATION = {
+    'CACHE_ALIAS': 'default',
+    'PRUNE_EVERY': 1000,
 }
 
 # CORS settings
@@ -162,4 +210,97 @@ PAYPAL_CLIENT_ID = os.environ.get('PAYPAL_CLIENT_ID')
 PAYPAL_SECRET = os.environ.get('PAYPAL_SECRET')
 
 # Get Google Books API key from environment variables
-GOOGLE_BOOKS_API_KEY = os.environ.get('GOOGLE_BOOKS_API_KEY')
\ No newline at end of file
+GOOGLE_BOOKS_API_KEY = os.environ.get('GOOGLE_BOOKS_API_KEY')
+
+# Google Books search result cache (see googlebooks/cache.py)
+GOOGLE_BOOKS_SEARCH_CACHE = {
+    'BACKEND': os.environ.get('GOOGLE_BOOKS_SEARCH_CACHE_BACKEND', 'memory'),
+    'CACHE_ALIAS': 'default',
+    'TTL': int(os.environ.get('GOOGLE_BOOKS_SEARCH_CACHE_TTL', 600)),
+    'MAX_ENTRIES': 1024,
+}
+
+# Pooled HTTP client for the Google Books API (see googlebooks/client.py)
+GOOGLE_BOOKS_CLIENT = {
+    'BASE_URL': os.environ.get('GOOGLE_BOOKS_API_URL', 'https://www.googleapis.com/books/v1'),
+    'POOL_SIZE': int(os.environ.get('GOOGLE_BOOKS_POOL_SIZE', 10)),
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 10,
+}
+
+# Trending books scoring (see books/trending.py, refreshed by manage.py refresh_trending)
+BOOKS_TRENDING = {
+    'HALF_LIFE_HOURS': 48,
+    'TOP_N': 100,
+}
+
+# Serve searches from the local full-text index (googlebooks/search_index.py) when it
+# has at least MIN_RESULTS matches, otherwise fall through to Google Books
+GOOGLE_BOOKS_LOCAL_SEARCH = {
+    'ENABLED': os.environ.get('GOOGLE_BOOKS_LOCAL_SEARCH', 'true').lower() == 'true',
+    'MIN_RESULTS': 20,
+}
+
+# Coalesce concurrent identical upstream lookups (see googlebooks/singleflight.py).
+# Set CACHE_ALIAS to a cache shared by all workers to coalesce across processes.
+GOOGLE_BOOKS_SINGLE_FLIGHT = {
+    'CACHE_ALIAS': None,
+    'LOCK_TIMEOUT': 15,
+}
+
+# Raw volume JSON cache with stale-while-revalidate (see googlebooks/volume_cache.py)
+GOOGLE_BOOKS_VOLUME_CACHE = {
+    'FRESH_TTL': 60 * 60 * 6,
+    'STALE_TTL': 60 * 60 * 24 * 7,
+    'REVALIDATE_WORKERS': 2,
+}
+
+# Background catalog refresh (manage.py refresh_catalog, see googlebooks/refresh.py)
+GOOGLE_BOOKS_CATALOG_REFRESH = {
+    'TTL': 60 * 60 * 24 * 7,
+    'RETRY_AFTER': 60 * 60 * 24,
+    'BATCH_SIZE': 200,
+    'WORKERS': 4,
+    'INLINE_UPDATES': False,
+}
+
+# Rate limiting and circuit breaking for Google Books calls (see googlebooks/guard.py).
+# Set CACHE_ALIAS to a cache shared by all workers so they spend one quota.
+GOOGLE_BOOKS_UPSTREAM_GUARD = {
+    'CACHE_ALIAS': None,
+    'RATE': float(os.environ.get('GOOGLE_BOOKS_RATE_LIMIT', 10)),
+    'BURST': 20,
+    'MAX_WAIT': 0.5,
+    'FAILURE_THRESHOLD': 5,
+    'RESET_TIMEOUT': 30,
+}
+
+# Cached subscription entitlements (see subscriptions/entitlements.py)
+SUBSCRIPTION_ENTITLEMENTS = {
+    'CACHE_ALIAS': 'default',
+    'TTL': 60 * 15,
+    'LOCAL_TTL': 5,
+}
+
+# Per-user library summary rows (see books/library.py)
+BOOKS_LIBRARY_SUMMARY = {
+    'RECENT_LIMIT': 10,
+}
+
+# Coalesce update_progress heartbeats in memory and write them in batches
+# (see books/progress.py). FLUSH_INTERVAL is the durability window in seconds.
+BOOKS_PROGRESS_BUFFER = {
+    'ENABLED': os.environ.get('BOOKS_PROGRESS_BUFFER', 'true').lower() == 'true',
+    'FLUSH_INTERVAL': 5,
+    'MAX_PENDING': 1000,
+}
+
+# Per-view latency / query / upstream histograms at /api/metrics/ (Prometheus text,
+# ?format=json) and sampled cProfile captures at /api/metrics/profiles/; see bookflix/profiling.py
+REQUEST_PROFILING = {
+    'ENABLED': os.environ.get('REQUEST_PROFILING', 'false').lower() == 'true',
+    'SLOW_REQUEST_SECONDS': 1.0,
+    'PROFILE_SAMPLE_RATE': float(os.environ.get('REQUEST_PROFILING_SAMPLE_RATE', 0.01)),
+    'PROFILE_KEEP': 20,
+    'METRICS_TOKEN': os.environ.get('METRICS_TOKEN', ''),
+}
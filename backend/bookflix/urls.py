@@ -6,6 +6,7 @@ from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
 from accounts.views import UserViewSet, SubscriptionPlanViewSet, SubscriptionViewSet
 from books.views import BookViewSet, UserFavoriteViewSet, ReadingHistoryViewSet
+from .profiling import metrics_view, profiles_view
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet)
@@ -23,4 +24,6 @@ urlpatterns = [
     path('api/subscriptions/', include('subscriptions.urls')),
     path('api/googlebooks/', include('googlebooks.urls')),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/metrics/', metrics_view, name='metrics'),
+    path('api/metrics/profiles/', profiles_view, name='metrics_profiles'),
 ]
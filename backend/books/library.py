@@ -0,0 +1,196 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from googlebooks.models import GoogleBookFavorite, GoogleBookReadingHistory
+
+from .models import LibrarySummary, ReadingHistory, UserFavorite
+
+# Defaults for settings.BOOKS_LIBRARY_SUMMARY
+DEFAULT_LIBRARY_SUMMARY = {
+    'RECENT_LIMIT': 10,  # Reading entries kept in LibrarySummary.recent
+}
+
+# catalog -> (favorite model, reading history model)
+CATALOGS = {
+    'books': (UserFavorite, ReadingHistory),
+    'googlebooks': (GoogleBookFavorite, GoogleBookReadingHistory),
+}
+
+
+def get_recent_limit():
+    return {**DEFAULT_LIBRARY_SUMMARY, **getattr(settings, 'BOOKS_LIBRARY_SUMMARY', {})}['RECENT_LIMIT']
+
+
+def recent_entry(book, progress, last_read):
+    return {
+        'book_id': book.pk,
+        'google_books_id': book.google_books_id,
+        'title': book.title,
+        'thumbnail_url': book.thumbnail_url or '',
+        'progress': progress,
+        'last_read': last_read.isoformat(),
+    }
+
+
+def progress_bucket(progress):
+    if progress is None or progress <= 0:
+        return None
+    return 'finished_count' if progress >= 100 else 'in_progress_count'
+
+
+def build_summary(user, catalog):
+    """Summary fields computed from the join tables (first use and rebuilds)."""
+    favorite_model, history_model = CATALOGS[catalog]
+    favorite_ids = list(
+        favorite_model.objects.filter(user=user).order_by('-created_at', '-id').values_list('book_id', flat=True)
+    )
+    history = history_model.objects.filter(user=user)
+    counts = history.aggregate(
+        in_progress=Count('id', filter=Q(progress__gt=0, progress__lt=100)),
+        finished=Count('id', filter=Q(progress__gte=100)),
+    )
+    recent = history.select_related('book').order_by('-last_read', '-id')[:get_recent_limit()]
+    return {
+        'favorite_ids': favorite_ids,
+        'recent': [recent_entry(row.book, row.progress, row.last_read) for row in recent],
+        'favorites_count': len(favorite_ids),
+        'in_progress_count': counts['in_progress'],
+        'finished_count': counts['finished'],
+    }
+
+
+def rebuild_summary(user, catalog):
+    summary, _ = LibrarySummary.objects.update_or_create(
+        user=user, catalog=catalog, defaults=build_summary(user, catalog)
+    )
+    return summary
+
+
+def get_summary(user, catalog):
+    """The user's summary row; built from the join tables on first access."""
+    summary = LibrarySummary.objects.filter(user=user, catalog=catalog).first()
+    return summary if summary is not None else rebuild_summary(user, catalog)
+
+
+def update_summary(user, catalog, favorited=(), unfavorited=(), progress=()):
+    """Fold already-applied favorite / progress changes into the summary row.
+
+    ``favorited`` / ``unfavorited`` are books whose favorite row was actually
+    created / deleted. ``progress`` holds ``(book, progress, previous, last_read)``
+    tuples in the order they happened, with ``previous`` None for a new entry.
+    """
+    with transaction.atomic():
+        summary = LibrarySummary.objects.select_for_update().filter(user=user, catalog=catalog).first()
+        if summary is None:
+            # The tables already include these changes
+            rebuild_summary(user, catalog)
+            return
+
+        removed = {book.pk for book in unfavorited}
+        favorite_ids = [book.pk for book in reversed(favorited) if book.pk not in summary.favorite_ids]
+        summary.favorite_ids = [pk for pk in favorite_ids + summary.favorite_ids if pk not in removed]
+        summary.favorites_count = len(summary.favorite_ids)
+
+        recent = summary.recent
+        for book, value, previous, last_read in progress:
+            old_bucket, new_bucket = progress_bucket(previous), progress_bucket(value)
+            if old_bucket != new_bucket:
+                if old_bucket:
+                    setattr(summary, old_bucket, max(0, getattr(summary, old_bucket) - 1))
+                if new_bucket:
+                    setattr(summary, new_bucket, getattr(summary, new_bucket) + 1)
+            recent = [recent_entry(book, value, last_read)] + [e for e in recent if e['book_id'] != book.pk]
+        summary.recent = recent[:get_recent_limit()]
+        summary.save()
+
+
+def apply_batch(user, catalog, items):
+    """Apply a list of favorite / unfavorite / progress items with set-based queries.
+
+    ``items`` are validated ``{'book', 'action', 'progress'}`` dicts, ``book``
+    being the google_books_id. When one book appears several times the last
+    favorite-type action and the last progress value win; earlier ones are
+    reported as ``superseded``. Returns one result dict per item, in order.
+    """
+    favorite_model, history_model = CATALOGS[catalog]
+    book_model = history_model._meta.get_field('book').related_model
+    books = book_model.objects.in_bulk({item['book'] for item in items}, field_name='google_books_id')
+
+    # Last action per book and kind wins
+    final = {}
+    for index, item in enumerate(items):
+        if item['book'] in books:
+            kind = 'progress' if item['action'] == 'progress' else 'favorite'
+            final[(item['book'], kind)] = index
+
+    favorite_ids = {books[book_id].pk for (book_id, kind), index in final.items()
+                    if kind == 'favorite' and items[index]['action'] == 'favorite'}
+    unfavorite_ids = {books[book_id].pk for (book_id, kind), index in final.items()
+                      if kind == 'favorite' and items[index]['action'] == 'unfavorite'}
+    progress = {books[book_id].pk: items[index]['progress'] for (book_id, kind), index in final.items()
+                if kind == 'progress'}
+
+    # Buffered heartbeats for these books are older than this batch
+    from .progress import get_progress_buffer
+    progress_buffer = get_progress_buffer()
+    if progress_buffer is not None:
+        progress_buffer.discard(catalog, user.pk, list(progress))
+
+    now = timezone.now()
+    with transaction.atomic():
+        existing = set(
+            favorite_model.objects.filter(user=user, book_id__in=favorite_ids | unfavorite_ids)
+            .values_list('book_id', flat=True)
+        )
+        added = favorite_ids - existing
+        removed = unfavorite_ids & existing
+        if added:
+            favorite_model.objects.bulk_create([favorite_model(user=user, book_id=pk) for pk in added],
+                                               ignore_conflicts=True)
+        if removed:
+            favorite_model.objects.filter(user=user, book_id__in=removed).delete()
+
+        rows = {row.book_id: row for row in history_model.objects.filter(user=user, book_id__in=list(progress))}
+        to_create, to_update, progress_changes = [], [], []
+        by_pk = {book.pk: book for book in books.values()}
+        for pk, value in progress.items():
+            row = rows.get(pk)
+            if row is None:
+                to_create.append(history_model(user=user, book_id=pk, progress=value))
+                previous = None
+            else:
+                previous = row.progress
+                row.progress = value
+                row.last_read = now
+                to_update.append(row)
+            progress_changes.append((by_pk[pk], value, previous, now))
+        if to_create:
+            history_model.objects.bulk_create(to_create)
+        if to_update:
+            history_model.objects.bulk_update(to_update, ['progress', 'last_read'])
+
+        update_summary(
+            user, catalog,
+            favorited=[by_pk[pk] for pk in added],
+            unfavorited=[by_pk[pk] for pk in removed],
+            progress=progress_changes,
+        )
+
+    results = []
+    for index, item in enumerate(items):
+        book = books.get(item['book'])
+        kind = 'progress' if item['action'] == 'progress' else 'favorite'
+        if book is None:
+            status = 'not found'
+        elif final[(item['book'], kind)] != index:
+            status = 'superseded'
+        elif item['action'] == 'progress':
+            status = 'progress updated'
+        elif item['action'] == 'favorite':
+            status = 'favorited' if book.pk in added else 'already favorited'
+        else:
+            status = 'unfavorited'
+        results.append({'book': item['book'], 'action': item['action'], 'status': status})
+    return results
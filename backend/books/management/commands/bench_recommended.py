@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from books.models import Book
+from books.sampling import sample_books
+
+
+class Command(BaseCommand):
+    help = 'Benchmark ORDER BY RANDOM() against sample_books on seeded catalogs (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'rows':>10} {'order_by(?) ms':>16} {'sample_books ms':>16}")
+        for rows in options['sizes']:
+            with transaction.atomic():
+                self.seed(rows, options['batch_size'])
+                queryset = Book.objects.all()
+                random_ms = self.time_it(lambda: list(queryset.order_by('?')[:10]), options['repeat'])
+                sampler_ms = self.time_it(lambda: sample_books(queryset, 10), options['repeat'])
+                transaction.set_rollback(True)
+            self.stdout.write(f'{rows:>10} {random_ms:>16.2f} {sampler_ms:>16.2f}')
+
+    def seed(self, rows, batch_size):
+        existing = Book.objects.count()
+        for start in range(existing, rows, batch_size):
+            Book.objects.bulk_create([
+                Book(google_books_id=f'bench-{i}', title=f'Bench book {i}', authors='Bench Author')
+                for i in range(start, min(start + batch_size, rows))
+            ])
+
+    def time_it(self, func, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - started) * 1000 / repeat
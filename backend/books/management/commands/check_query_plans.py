@@ -0,0 +1,128 @@
+import re
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from books.models import Book, ReadingHistory, UserFavorite
+from googlebooks.models import GoogleBook, GoogleBookFavorite, GoogleBookReadingHistory
+from subscriptions.models import SubscriptionTier, UserSubscription
+
+# Plan lines that mean a table (or a whole result set) is read without an index
+FULL_SCAN_PATTERNS = {
+    'sqlite': [re.compile(r'\bSCAN (?:TABLE )?(\w+)$', re.MULTILINE), re.compile(r'USE TEMP B-TREE FOR ORDER BY')],
+    'postgresql': [re.compile(r'Seq Scan on (\w+)'), re.compile(r'^\s*(?:->\s*)?Sort\b', re.MULTILINE)],
+}
+PAGE_SIZE = 21  # Cursor pagination reads page_size + 1 rows
+
+
+def hot_queries(user_id):
+    """The request-path queries the composite indexes exist for, as the views issue them."""
+    now = timezone.now()
+    return {
+        'subscriptions current': UserSubscription.objects.filter(
+            user_id=user_id, is_active=True, end_date__gt=now
+        ).order_by('-end_date')[:1],
+        'books reading history': ReadingHistory.objects.filter(user_id=user_id).select_related('book')
+        .order_by('-last_read', '-id')[:PAGE_SIZE],
+        'books favorites': UserFavorite.objects.filter(user_id=user_id).select_related('book')
+        .order_by('-created_at', '-id')[:PAGE_SIZE],
+        'googlebooks reading history': GoogleBookReadingHistory.objects.filter(user_id=user_id)
+        .select_related('book').order_by('-last_read', '-id')[:PAGE_SIZE],
+        'googlebooks favorites': GoogleBookFavorite.objects.filter(user_id=user_id).select_related('book')
+        .order_by('-created_at', '-id')[:PAGE_SIZE],
+        'books new releases': Book.objects.exclude(publication_date=None).order_by('-publication_date')[:10],
+    }
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot subscription / activity queries and fail if any of them scans a full table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed-users', type=int, default=0,
+                            help='Seed this many users with activity first (rolled back afterwards)')
+        parser.add_argument('--per-user', type=int, default=50, help='History and favorite rows per seeded user')
+        parser.add_argument('--books', type=int, default=20_000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        patterns = FULL_SCAN_PATTERNS.get(connection.vendor)
+        if patterns is None:
+            raise CommandError(f'No plan checks for the {connection.vendor} backend')
+
+        with transaction.atomic():
+            if options['seed_users']:
+                user_id = self.seed(options)
+                self.analyze()
+            else:
+                user_id = get_user_model().objects.values_list('pk', flat=True).first() or 0
+            failures = self.check_plans(user_id, patterns)
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f"Full scans in: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS('All hot queries use an index'))
+
+    def check_plans(self, user_id, patterns):
+        failures = []
+        for name, queryset in hot_queries(user_id).items():
+            plan = queryset.explain()
+            scans = [match.group(0).strip() for pattern in patterns for match in pattern.finditer(plan)]
+            status = self.style.ERROR('FULL SCAN') if scans else self.style.SUCCESS('ok')
+            self.stdout.write(f'{name:<30} {status}')
+            if scans or self.verbosity > 1:
+                self.stdout.write('    ' + plan.replace('\n', '\n    '))
+            if scans:
+                failures.append(name)
+        return failures
+
+    def seed(self, options):
+        batch_size = options['batch_size']
+        User = get_user_model()
+        users = User.objects.bulk_create([
+            User(username=f'plan-user-{i}', email=f'plan-user-{i}@example.com', password='!')
+            for i in range(options['seed_users'])
+        ], batch_size=batch_size)
+        if users[0].pk is None:
+            users = list(User.objects.filter(username__startswith='plan-user-'))
+
+        today = date.today()
+        books = Book.objects.bulk_create([
+            Book(google_books_id=f'plan-{i}', title=f'Plan book {i}', authors='Plan Author',
+                 publication_date=today - timedelta(days=i % 3650) if i % 4 else None)
+            for i in range(options['books'])
+        ], batch_size=batch_size)
+        google_books = GoogleBook.objects.bulk_create([
+            GoogleBook(google_books_id=f'plan-{i}', title=f'Plan book {i}') for i in range(options['books'])
+        ], batch_size=batch_size)
+        if books[0].pk is None:
+            books = list(Book.objects.filter(google_books_id__startswith='plan-'))
+            google_books = list(GoogleBook.objects.filter(google_books_id__startswith='plan-'))
+
+        tier = SubscriptionTier.objects.create(name='Plan check', price=0, book_limit=0, max_downloads=0,
+                                               description='Seeded by check_query_plans')
+        now = timezone.now()
+        per_user = min(options['per_user'], len(books))
+        for offset, user in enumerate(users):
+            picks = [(offset * per_user + i) % len(books) for i in range(per_user)]
+            ReadingHistory.objects.bulk_create([ReadingHistory(user=user, book=books[i]) for i in picks])
+            UserFavorite.objects.bulk_create([UserFavorite(user=user, book=books[i]) for i in picks])
+            GoogleBookReadingHistory.objects.bulk_create(
+                [GoogleBookReadingHistory(user=user, book=google_books[i]) for i in picks]
+            )
+            GoogleBookFavorite.objects.bulk_create([GoogleBookFavorite(user=user, book=google_books[i]) for i in picks])
+            UserSubscription.objects.bulk_create([
+                UserSubscription(user=user, tier=tier, start_date=now - timedelta(days=30 * i),
+                                 end_date=now - timedelta(days=30 * i - 7), is_active=i == 0)
+                for i in range(3)
+            ])
+        self.stdout.write(f'Seeded {len(users)} users, {len(books)} books, {len(users) * per_user} rows per activity table')
+        return users[len(users) // 2].pk
+
+    def analyze(self):
+        # Give the planner real statistics for the seeded tables
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
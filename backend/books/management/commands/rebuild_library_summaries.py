@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from books.library import CATALOGS, rebuild_summary
+
+
+class Command(BaseCommand):
+    help = 'Recompute LibrarySummary rows from the favorite and reading history tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='users', help='Username to rebuild (repeatable)')
+        parser.add_argument('--catalog', choices=sorted(CATALOGS), help='Only this catalog')
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.order_by('pk')
+        if options['users']:
+            users = users.filter(username__in=options['users'])
+        catalogs = [options['catalog']] if options['catalog'] else sorted(CATALOGS)
+
+        rebuilt = 0
+        for user in users.iterator():
+            for catalog in catalogs:
+                rebuild_summary(user, catalog)
+                rebuilt += 1
+        self.stdout.write(f'Rebuilt {rebuilt} library summaries')
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from books.trending import refresh_trending
+
+
+class Command(BaseCommand):
+    help = 'Fold recent favorites and reads into the trending scores and re-rank the top N'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running, refreshing every N seconds (0 runs once)')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            stats = refresh_trending()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.stdout.write(
+                f"Trending refreshed in {elapsed_ms:.0f} ms: {stats['events']} books with new activity, "
+                f"{stats['created']} new, {stats['updated']} updated"
+            )
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
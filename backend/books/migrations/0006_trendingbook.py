@@ -0,0 +1,27 @@
+# Generated by Django 4.2.19 on 2026-10-18 09:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0005_rename_google_books_id_book_openlibrary_id_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingBook',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(default=0)),
+                ('rank', models.PositiveIntegerField(blank=True, db_index=True, null=True)),
+                ('refreshed_at', models.DateTimeField()),
+                ('book', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='trending', to='books.book')),
+            ],
+            options={
+                'ordering': ['rank'],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.19 on 2026-10-18 13:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('books', '0006_trendingbook'),
+    ]
+
+    operations = [
+        # 0005 dropped publication_date although Book and new_releases still use it
+        migrations.AddField(
+            model_name='book',
+            name='publication_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-publication_date'], name='books_book_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userfavorite',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='books_fav_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='readinghistory',
+            index=models.Index(fields=['user', '-last_read', '-id'], name='books_hist_user_recent_idx'),
+        ),
+    ]
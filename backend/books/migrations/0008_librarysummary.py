@@ -0,0 +1,33 @@
+# Generated by Django 4.2.19 on 2026-10-18 14:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('books', '0007_book_publication_date_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LibrarySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('catalog', models.CharField(choices=[('books', 'Books'), ('googlebooks', 'Google Books')], max_length=20)),
+                ('favorite_ids', models.JSONField(default=list)),
+                ('recent', models.JSONField(default=list)),
+                ('favorites_count', models.PositiveIntegerField(default=0)),
+                ('in_progress_count', models.PositiveIntegerField(default=0)),
+                ('finished_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='library_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'catalog')},
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.19 on 2026-10-18 18:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0008_librarysummary'),
+    ]
+
+    operations = [
+        # 0005 also dropped thumbnail_url / preview_link and added cover_id;
+        # bring the schema back in line with Book
+        migrations.RemoveField(
+            model_name='book',
+            name='cover_id',
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='preview_link',
+            field=models.URLField(blank=True, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='thumbnail_url',
+            field=models.URLField(blank=True, max_length=500),
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='google_books_id',
+            field=models.CharField(db_index=True, max_length=100, unique=True),
+        ),
+    ]
@@ -14,6 +14,12 @@ class Book(models.Model):
     subjects = models.TextField(blank=True)
     favorited_by = models.ManyToManyField(settings.AUTH_USER_MODEL, through='UserFavorite', related_name='favorite_books')
 
+    class Meta:
+        indexes = [
+            # new_releases: newest publication dates first
+            models.Index(fields=['-publication_date'], name='books_book_pub_date_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -24,6 +30,10 @@ class UserFavorite(models.Model):
 
     class Meta:
         unique_together = ('user', 'book')
+        indexes = [
+            # A user's favorites, newest first (CreatedAtCursorPagination)
+            models.Index(fields=['user', '-created_at', '-id'], name='books_fav_user_recent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.book.title}"
@@ -37,6 +47,44 @@ class ReadingHistory(models.Model):
     class Meta:
         unique_together = ('user', 'book')
         ordering = ['-last_read']
+        indexes = [
+            # A user's history, most recently read first (LastReadCursorPagination)
+            models.Index(fields=['user', '-last_read', '-id'], name='books_hist_user_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username}'s progress on {self.book.title}: {self.progress}%"
+
+class TrendingBook(models.Model):
+    book = models.OneToOneField(Book, on_delete=models.CASCADE, related_name='trending')
+    score = models.FloatField(default=0)  # Time-decayed activity score as of refreshed_at
+    rank = models.PositiveIntegerField(null=True, blank=True, db_index=True)  # Set for the top N only
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['rank']
+
+    def __str__(self):
+        return f"#{self.rank} {self.book.title} ({self.score:.2f})"
+
+class LibrarySummary(models.Model):
+    """Per-user library state for one catalog, kept current by the favorite / progress views."""
+    CATALOG_CHOICES = [
+        ('books', 'Books'),
+        ('googlebooks', 'Google Books'),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='library_summaries')
+    catalog = models.CharField(max_length=20, choices=CATALOG_CHOICES)
+    favorite_ids = models.JSONField(default=list)  # Newest first
+    recent = models.JSONField(default=list)  # Last N reading entries with progress, most recent first
+    favorites_count = models.PositiveIntegerField(default=0)
+    in_progress_count = models.PositiveIntegerField(default=0)
+    finished_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'catalog')
 
     def __str__(self):
-        return f"{self.user.username}'s progress on {self.book.title}: {self.progress}%"
\ No newline at end of file
+        return f"{self.user.username}'s {self.catalog} library"
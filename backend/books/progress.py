@@ -0,0 +1,230 @@
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from .library import CATALOGS, get_recent_limit, progress_bucket, recent_entry, update_summary
+
+logger = logging.getLogger(__name__)
+
+# Defaults for settings.BOOKS_PROGRESS_BUFFER
+DEFAULT_PROGRESS_BUFFER = {
+    'ENABLED': True,
+    'FLUSH_INTERVAL': 5,  # Durability window: seconds a heartbeat may sit in memory
+    'MAX_PENDING': 1000,  # Flush early once this many (user, book) pairs are waiting
+}
+
+
+class ProgressBuffer:
+    """Coalesces update_progress heartbeats in memory and writes them in batches.
+
+    Only the latest value per (catalog, user, book) is kept. A background
+    thread flushes every ``flush_interval`` seconds with one ``bulk_update``
+    / ``bulk_create`` per catalog, and once more at interpreter shutdown.
+    ``pending()`` overlays unflushed values so the writing process reads its
+    own writes; other processes see them within the flush interval. The
+    batch being written stays in that overlay until its transaction commits,
+    so reads never fall back to the older stored value mid-flush.
+    """
+
+    def __init__(self, flush_interval, max_pending):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.flushed = 0
+        self._pending = {}
+        self._flushing = {}  # Taken by the running flush, not committed yet
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_settings(cls):
+        config = get_progress_buffer_config()
+        return cls(config['FLUSH_INTERVAL'], config['MAX_PENDING'])
+
+    def record(self, catalog, user_id, book_id, progress):
+        with self._lock:
+            self._pending[(catalog, user_id, book_id)] = (progress, timezone.now())
+            size = len(self._pending)
+            if self._thread is None:
+                self._start()
+        if size >= self.max_pending:
+            self._wakeup.set()
+
+    def pending(self, catalog, user_id, book_ids):
+        """Unflushed progress for these books, as {book_id: progress}."""
+        overlay = {}
+        with self._lock:
+            for book_id in book_ids:
+                key = (catalog, user_id, book_id)
+                value = self._pending.get(key) or self._flushing.get(key)
+                if value is not None:
+                    overlay[book_id] = value[0]
+        return overlay
+
+    def pending_entries(self, catalog, user_id):
+        """All of one user's unflushed progress in a catalog, as {book_id: (progress, recorded_at)}."""
+        entries = {}
+        with self._lock:
+            for source in (self._flushing, self._pending):
+                for (entry_catalog, entry_user_id, book_id), value in source.items():
+                    if entry_catalog == catalog and entry_user_id == user_id:
+                        entries[book_id] = value
+        return entries
+
+    def discard(self, catalog, user_id, book_ids):
+        """Drop buffered values superseded by a direct write."""
+        with self._lock:
+            for book_id in book_ids:
+                self._pending.pop((catalog, user_id, book_id), None)
+                self._flushing.pop((catalog, user_id, book_id), None)
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {'pending': pending, 'flushed': self.flushed}
+
+    def flush(self):
+        """Write everything buffered so far; returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._flushing = pending
+            if not pending:
+                return 0
+
+            by_catalog = defaultdict(dict)
+            for (catalog, user_id, book_id), value in pending.items():
+                by_catalog[catalog][(user_id, book_id)] = value
+            try:
+                for catalog, updates in by_catalog.items():
+                    self._write(catalog, updates)
+            except Exception:
+                # Keep entries that no newer heartbeat replaced, for the next flush
+                with self._lock:
+                    for key, value in pending.items():
+                        self._pending.setdefault(key, value)
+                    self._flushing = {}
+                raise
+            with self._lock:
+                self._flushing = {}
+            self.flushed += len(pending)
+            return len(pending)
+
+    def _write(self, catalog, updates):
+        try:
+            changes = self._write_rows(catalog, updates)
+        except IntegrityError:
+            # A row was created concurrently; it exists now, so retry as updates
+            changes = self._write_rows(catalog, updates)
+
+        users = get_user_model().objects.in_bulk(list(changes))
+        for user_id, items in changes.items():
+            if user_id in users:
+                update_summary(users[user_id], catalog, progress=sorted(items, key=lambda item: item[3]))
+
+    def _write_rows(self, catalog, updates):
+        _, history_model = CATALOGS[catalog]
+        book_model = history_model._meta.get_field('book').related_model
+        user_ids = {user_id for user_id, _ in updates}
+        book_ids = {book_id for _, book_id in updates}
+        changes = defaultdict(list)
+        with transaction.atomic():
+            books = book_model.objects.in_bulk(list(book_ids))
+            rows = {
+                (row.user_id, row.book_id): row
+                for row in history_model.objects.filter(user_id__in=user_ids, book_id__in=book_ids)
+            }
+            to_create, to_update = [], []
+            for (user_id, book_id), (progress, recorded_at) in updates.items():
+                if book_id not in books:
+                    continue  # Deleted since the heartbeat
+                row = rows.get((user_id, book_id))
+                if row is None:
+                    row = history_model(user_id=user_id, book_id=book_id, progress=progress)
+                    previous = None
+                    to_create.append(row)
+                else:
+                    previous = row.progress
+                    row.progress = progress
+                    row.last_read = recorded_at
+                    to_update.append(row)
+                changes[user_id].append((books[book_id], progress, previous, recorded_at))
+            if to_create:
+                history_model.objects.bulk_create(to_create)
+            if to_update:
+                history_model.objects.bulk_update(to_update, ['progress', 'last_read'])
+        return changes
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name='progress-flush', daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as err:
+                logger.error(f'Flushing reading progress failed: {err}')
+            finally:
+                close_old_connections()
+
+
+def overlay_pending(summary, catalog):
+    """Fold the user's buffered heartbeats into a LibrarySummary before it is served.
+
+    The summary row only catches up when the buffer flushes; like the
+    ``pending()`` overlay on list responses, this keeps the writing process
+    reading its own progress. The row is changed in memory only, never saved.
+    """
+    progress_buffer = get_progress_buffer()
+    entries = progress_buffer.pending_entries(catalog, summary.user_id) if progress_buffer is not None else {}
+    if not entries:
+        return summary
+
+    _, history_model = CATALOGS[catalog]
+    book_model = history_model._meta.get_field('book').related_model
+    books = book_model.objects.in_bulk(list(entries))
+    stored = dict(
+        history_model.objects.filter(user_id=summary.user_id, book_id__in=list(entries))
+        .values_list('book_id', 'progress')
+    )
+    recent = {entry['book_id']: entry for entry in summary.recent}
+    for book_id, (progress, recorded_at) in entries.items():
+        if book_id not in books:
+            continue  # Deleted since the heartbeat
+        old_bucket, new_bucket = progress_bucket(stored.get(book_id)), progress_bucket(progress)
+        if old_bucket != new_bucket:
+            if old_bucket:
+                setattr(summary, old_bucket, max(0, getattr(summary, old_bucket) - 1))
+            if new_bucket:
+                setattr(summary, new_bucket, getattr(summary, new_bucket) + 1)
+        recent[book_id] = recent_entry(books[book_id], progress, recorded_at)
+    summary.recent = sorted(recent.values(), key=lambda entry: entry['last_read'], reverse=True)[:get_recent_limit()]
+    return summary
+
+
+def get_progress_buffer_config():
+    return {**DEFAULT_PROGRESS_BUFFER, **getattr(settings, 'BOOKS_PROGRESS_BUFFER', {})}
+
+
+_progress_buffer = None
+
+
+def get_progress_buffer():
+    """The process-wide buffer, or None when buffering is disabled."""
+    global _progress_buffer
+    if not get_progress_buffer_config()['ENABLED']:
+        return None
+    if _progress_buffer is None:
+        _progress_buffer = ProgressBuffer.from_settings()
+    return _progress_buffer
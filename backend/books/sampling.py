@@ -0,0 +1,42 @@
+import random
+
+from django.db.models import Max, Min
+
+
+def sample_books(queryset, size, attempts=3, oversample=3):
+    """Pick ``size`` random rows without sorting the whole table.
+
+    Probes random ids inside the primary-key range (one indexed MIN/MAX and
+    one ``IN`` lookup per attempt). Gaps left by deleted rows are covered by
+    oversampling; if the id space is too sparse, the remainder is filled
+    from a random starting id with an indexed range scan.
+    """
+    bounds = queryset.aggregate(low=Min('id'), high=Max('id'))
+    low, high = bounds['low'], bounds['high']
+    if low is None:
+        return []
+
+    picked = {}
+    span = range(low, high + 1)
+    for _ in range(attempts):
+        missing = size - len(picked)
+        if missing <= 0:
+            break
+        probe_ids = random.sample(span, min(missing * oversample, len(span)))
+        for book in queryset.filter(id__in=probe_ids).exclude(id__in=list(picked)):
+            if len(picked) < size:
+                picked[book.id] = book
+
+    missing = size - len(picked)
+    if missing > 0:
+        start = random.randint(low, high)
+        tail = list(queryset.filter(id__gte=start).exclude(id__in=list(picked)).order_by('id')[:missing])
+        if len(tail) < missing:
+            exclude = list(picked) + [book.id for book in tail]
+            tail += list(queryset.exclude(id__in=exclude).order_by('id')[:missing - len(tail)])
+        for book in tail:
+            picked[book.id] = book
+
+    books = list(picked.values())
+    random.shuffle(books)
+    return books
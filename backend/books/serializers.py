@@ -1,40 +1,52 @@
 from rest_framework import serializers
-from .models import Book, UserFavorite, ReadingHistory
+from bookflix.serializers import LibraryStateListSerializer, LibraryStateMixin, NestedLibraryStateMixin
+from .models import Book, LibrarySummary, UserFavorite, ReadingHistory
 
-class BookSerializer(serializers.ModelSerializer):
+class BookSerializer(LibraryStateMixin, serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     reading_progress = serializers.SerializerMethodField()
+    favorite_model = UserFavorite
+    history_model = ReadingHistory
+    library_catalog = 'books'
 
     class Meta:
         model = Book
         fields = ['id', 'google_books_id', 'title', 'authors', 'description',
                 'thumbnail_url', 'preview_link', 'isbn', 'number_of_pages', 
                 'subjects', 'is_favorited', 'reading_progress']
+        list_serializer_class = LibraryStateListSerializer
 
-    def get_is_favorited(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return UserFavorite.objects.filter(user=request.user, book=obj).exists()
-        return False
-
-    def get_reading_progress(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            history = ReadingHistory.objects.filter(user=request.user, book=obj).first()
-            if history:
-                return history.progress
-        return 0
-
-class UserFavoriteSerializer(serializers.ModelSerializer):
+class UserFavoriteSerializer(NestedLibraryStateMixin, serializers.ModelSerializer):
     book = BookSerializer(read_only=True)
 
     class Meta:
         model = UserFavorite
         fields = ['id', 'book', 'created_at']
+        list_serializer_class = LibraryStateListSerializer
 
-class ReadingHistorySerializer(serializers.ModelSerializer):
+class ReadingHistorySerializer(NestedLibraryStateMixin, serializers.ModelSerializer):
     book = BookSerializer(read_only=True)
 
     class Meta:
         model = ReadingHistory
-        fields = ['id', 'book', 'last_read', 'progress']
\ No newline at end of file
+        fields = ['id', 'book', 'last_read', 'progress']
+        list_serializer_class = LibraryStateListSerializer
+
+class LibrarySummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = LibrarySummary
+        fields = ['catalog', 'favorite_ids', 'recent', 'favorites_count', 'in_progress_count',
+                  'finished_count', 'updated_at']
+
+class LibraryBatchItemSerializer(serializers.Serializer):
+    book = serializers.CharField(max_length=100, help_text='google_books_id')
+    action = serializers.ChoiceField(choices=['favorite', 'unfavorite', 'progress'])
+    progress = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if attrs['action'] == 'progress' and 'progress' not in attrs:
+            raise serializers.ValidationError({'progress': 'This field is required for progress items.'})
+        return attrs
+
+class LibraryBatchSerializer(serializers.Serializer):
+    items = serializers.ListField(child=LibraryBatchItemSerializer(), allow_empty=False, max_length=200)
@@ -0,0 +1,57 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from .progress import ProgressBuffer
+
+
+class MigrationStateTests(TestCase):
+    def test_models_match_migrations(self):
+        # Exits with status 1 when a model change has no migration
+        call_command('makemigrations', 'books', check=True, dry_run=True, stdout=StringIO())
+
+
+class QueryPlanTests(TestCase):
+    """The hot activity / subscription queries are answered from an index (see check_query_plans)."""
+
+    def test_hot_queries_use_indexes(self):
+        if connection.vendor == 'postgresql':
+            # A handful of seeded rows is cheaper to scan; only ask whether an index can serve the query
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('SET LOCAL enable_sort = off')
+        elif connection.vendor != 'sqlite':
+            self.skipTest(f'No plan checks for the {connection.vendor} backend')
+
+        out = StringIO()
+        # Raises CommandError naming the queries that scan a full table
+        call_command('check_query_plans', seed_users=20, per_user=20, books=500, stdout=out)
+        self.assertIn('All hot queries use an index', out.getvalue())
+
+
+class ProgressBufferTests(SimpleTestCase):
+    def setUp(self):
+        self.buffer = ProgressBuffer(flush_interval=60, max_pending=1000)
+        starter = mock.patch.object(self.buffer, '_start')
+        starter.start()
+        self.addCleanup(starter.stop)
+
+    def test_flushing_batch_stays_visible_until_written(self):
+        seen = []
+        self.buffer.record('books', 1, 7, 40)
+        with mock.patch.object(self.buffer, '_write', lambda catalog, updates: seen.append(
+                self.buffer.pending('books', 1, [7]))):
+            self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(seen, [{7: 40}])
+        self.assertEqual(self.buffer.pending('books', 1, [7]), {})
+
+    def test_failed_flush_keeps_entries(self):
+        self.buffer.record('books', 1, 7, 40)
+        with mock.patch.object(self.buffer, '_write', side_effect=RuntimeError('database is locked')):
+            with self.assertRaises(RuntimeError):
+                self.buffer.flush()
+        self.assertEqual(self.buffer.pending('books', 1, [7]), {7: 40})
+        self.assertEqual(self.buffer.stats()['pending'], 1)
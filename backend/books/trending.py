@@ -0,0 +1,84 @@
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from .models import ReadingHistory, TrendingBook, UserFavorite
+
+# Defaults for settings.BOOKS_TRENDING
+DEFAULT_TRENDING = {
+    'HALF_LIFE_HOURS': 48,
+    'TOP_N': 100,
+    'FAVORITE_WEIGHT': 3.0,
+    'READ_WEIGHT': 1.0,
+    'BACKFILL_DAYS': 14,  # Window scanned on the first refresh
+    'MIN_SCORE': 0.01,  # Rows decayed below this are dropped
+}
+
+
+def get_trending_config():
+    return {**DEFAULT_TRENDING, **getattr(settings, 'BOOKS_TRENDING', {})}
+
+
+def decay(elapsed, half_life_hours):
+    return math.pow(0.5, elapsed.total_seconds() / (half_life_hours * 3600))
+
+
+def top_trending(limit=10):
+    """Books in precomputed rank order; a single indexed read."""
+    rows = TrendingBook.objects.filter(rank__isnull=False).select_related('book').order_by('rank')[:limit]
+    return [row.book for row in rows]
+
+
+def refresh_trending(now=None):
+    """Fold activity since the last refresh into the stored scores and re-rank.
+
+    Stored scores are decayed to ``now`` with one UPDATE, then favorites
+    created and reads recorded since the previous refresh are added with
+    their own decay. Only the new events are read, so a refresh costs time
+    proportional to recent activity rather than to the whole history.
+    """
+    config = get_trending_config()
+    now = now or timezone.now()
+    half_life = config['HALF_LIFE_HOURS']
+
+    with transaction.atomic():
+        last_refresh = TrendingBook.objects.aggregate(last=Max('refreshed_at'))['last']
+        since = last_refresh or now - timedelta(days=config['BACKFILL_DAYS'])
+
+        if last_refresh:
+            TrendingBook.objects.update(score=F('score') * decay(now - last_refresh, half_life), refreshed_at=now)
+            TrendingBook.objects.filter(score__lt=config['MIN_SCORE']).delete()
+
+        gains = defaultdict(float)
+        favorites = UserFavorite.objects.filter(created_at__gt=since, created_at__lte=now)
+        for book_id, created_at in favorites.values_list('book_id', 'created_at').iterator():
+            gains[book_id] += config['FAVORITE_WEIGHT'] * decay(now - created_at, half_life)
+        reads = ReadingHistory.objects.filter(last_read__gt=since, last_read__lte=now)
+        for book_id, last_read in reads.values_list('book_id', 'last_read').iterator():
+            gains[book_id] += config['READ_WEIGHT'] * decay(now - last_read, half_life)
+
+        existing = {row.book_id: row for row in TrendingBook.objects.filter(book_id__in=list(gains))}
+        to_create, to_update = [], []
+        for book_id, gain in gains.items():
+            row = existing.get(book_id)
+            if row is None:
+                to_create.append(TrendingBook(book_id=book_id, score=gain, refreshed_at=now))
+            else:
+                row.score += gain
+                to_update.append(row)
+        TrendingBook.objects.bulk_create(to_create)
+        TrendingBook.objects.bulk_update(to_update, ['score'])
+
+        TrendingBook.objects.exclude(rank=None).update(rank=None)
+        top_ids = TrendingBook.objects.order_by('-score').values_list('id', flat=True)[:config['TOP_N']]
+        TrendingBook.objects.bulk_update(
+            [TrendingBook(id=row_id, rank=rank) for rank, row_id in enumerate(top_ids, start=1)],
+            ['rank'],
+        )
+
+    return {'events': len(gains), 'created': len(to_create), 'updated': len(to_update)}
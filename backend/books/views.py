@@ -1,11 +1,24 @@
+import logging
+import requests
+from bookflix.pagination import CreatedAtCursorPagination, LastReadCursorPagination
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from googleapiclient.discovery import build
 from django.conf import settings
+from .library import apply_batch, get_summary, update_summary
 from .models import Book, UserFavorite, ReadingHistory
-from .serializers import BookSerializer, UserFavoriteSerializer, ReadingHistorySerializer
+from .progress import get_progress_buffer, overlay_pending
+from .sampling import sample_books
+from .serializers import (
+    BookSerializer, LibraryBatchSerializer, LibrarySummarySerializer, UserFavoriteSerializer, ReadingHistorySerializer
+)
+from .trending import top_trending
+from googlebooks.client import get_client
+from googlebooks.ingest import ingest_volumes
 from googlebooks.models import GoogleBook
+from googlebooks.normalize import BOOK_FIELDS
+
+logger = logging.getLogger(__name__)
 
 class BookViewSet(viewsets.ModelViewSet):
     queryset = Book.objects.all()
@@ -17,8 +30,11 @@ class BookViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def trending(self, request):
-        # For now, return the most recently added books as trending
-        trending_books = self.get_queryset().order_by('-id')[:10]
+        # Ranks are precomputed by the refresh_trending command
+        trending_books = top_trending(10)
+        if not trending_books:
+            # No activity scored yet, fall back to the most recently added books
+            trending_books = self.get_queryset().order_by('-id')[:10]
         serializer = self.get_serializer(trending_books, many=True)
         return Response(serializer.data)
 
@@ -31,8 +47,8 @@ class BookViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def recommended(self, request):
-        # For now, return random books as recommendations
-        recommended_books = self.get_queryset().order_by('?')[:10]
+        # Random books as recommendations, sampled by id instead of ORDER BY RANDOM()
+        recommended_books = sample_books(self.get_queryset(), 10)
         serializer = self.get_serializer(recommended_books, many=True)
         return Response(serializer.data)
 
@@ -43,26 +59,15 @@ class BookViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Query parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            import requests
-            import logging
-            logger = logging.getLogger(__name__)
-            
             logger.info(f'Searching Google Books for query: {query}')
-            response = requests.get(
-                f'https://www.googleapis.com/books/v1/volumes?q={query}&maxResults=40&key={settings.GOOGLE_BOOKS_API_KEY}',
-                timeout=10  # Add timeout to prevent hanging
-            )
             
             # Handle HTTP errors from Google Books
             try:
-                response.raise_for_status()
+                data = get_client().search(query, max_results=40)
             except requests.exceptions.HTTPError as http_err:
                 logger.error(f'HTTP error occurred: {http_err}')
                 return Response({'error': 'Failed to fetch data from Google Books'}, 
                                status=status.HTTP_503_SERVICE_UNAVAILABLE)
-            
-            try:
-                data = response.json()
             except ValueError as json_err:
                 logger.error(f'Invalid JSON response: {json_err}')
                 return Response({'error': 'Invalid response from Google Books'}, 
@@ -74,41 +79,9 @@ class BookViewSet(viewsets.ModelViewSet):
                 
             logger.info(f'Found {len(data.get("items", []))} results for query: {query}')
             
-            books_data = []
-            for item in data.get('items', []):
-                try:
-                    # Skip items without an ID or title
-                    volume_info = item.get('volumeInfo', {})
-                    if not item.get('id') or not volume_info.get('title'):
-                        continue
-
-                    # Get the Google Books ID
-                    google_books_id = item.get('id')
-                    
-                    # Get volume info from the item
-                    volume_info = item.get('volumeInfo', {})
-                    
-                    book_data = {
-                        'google_books_id': google_books_id,
-                        'title': volume_info.get('title', '').strip(),
-                        'authors': ', '.join(volume_info.get('authors', ['Unknown Author'])),
-                        'description': volume_info.get('description', ''),
-                        'thumbnail_url': volume_info.get('imageLinks', {}).get('thumbnail', ''),
-                        'preview_link': volume_info.get('previewLink', '')
-                    }
-                    
-                    if not book_data['google_books_id']:
-                        logger.warning(f'Skipping book with missing ID: {item}')
-                        continue
-                        
-                    book, _ = Book.objects.get_or_create(
-                        google_books_id=book_data['google_books_id'],
-                        defaults=book_data
-                    )
-                    books_data.append(book)
-                except Exception as book_err:
-                    logger.error(f'Error processing book data: {book_err}')
-                    continue
+            # Skip items without a title, then create or update all rows in one transaction
+            items = [item for item in data.get('items', []) if (item.get('volumeInfo') or {}).get('title')]
+            books_data = ingest_volumes(items, model=Book, field_map=BOOK_FIELDS)
 
             serializer = self.get_serializer(books_data, many=True)
             return Response(serializer.data)
@@ -140,39 +113,69 @@ class BookViewSet(viewsets.ModelViewSet):
             user=request.user,
             book=book
         )
+        if created:
+            update_summary(request.user, 'books', favorited=[book])
         return Response({'status': 'favorited' if created else 'already favorited'})
 
     @action(detail=True, methods=['post'])
     def unfavorite(self, request, google_books_id=None):
         book = self.get_object()
-        UserFavorite.objects.filter(user=request.user, book=book).delete()
+        deleted, _ = UserFavorite.objects.filter(user=request.user, book=book).delete()
+        if deleted:
+            update_summary(request.user, 'books', unfavorited=[book])
         return Response({'status': 'unfavorited'})
 
     @action(detail=True, methods=['post'])
     def update_progress(self, request, google_books_id=None):
         book = self.get_object()
-        progress = request.data.get('progress', 0)
-        history, _ = ReadingHistory.objects.get_or_create(
+        try:
+            progress = int(request.data.get('progress', 0))
+        except (TypeError, ValueError):
+            return Response({'error': 'progress must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        progress_buffer = get_progress_buffer()
+        if progress_buffer is not None:
+            # Heartbeats are coalesced and written in batches by the buffer
+            progress_buffer.record('books', request.user.pk, book.pk, progress)
+            return Response({'status': 'progress updated'})
+        history, created = ReadingHistory.objects.get_or_create(
             user=request.user,
             book=book,
             defaults={'progress': progress}
         )
+        previous = None if created else history.progress
         history.progress = progress
         history.save()
+        update_summary(request.user, 'books', progress=[(book, progress, previous, history.last_read)])
         return Response({'status': 'progress updated'})
 
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def library(self, request):
+        # Favorite ids, recent reads and counts from one precomputed row, plus unflushed progress
+        summary = overlay_pending(get_summary(request.user, 'books'), 'books')
+        return Response(LibrarySummarySerializer(summary).data)
+
+    @action(detail=False, methods=['post'], url_path='library/batch', permission_classes=[permissions.IsAuthenticated])
+    def library_batch(self, request):
+        # Many favorite / unfavorite / progress changes in one request and one transaction
+        serializer = LibraryBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = apply_batch(request.user, 'books', serializer.validated_data['items'])
+        return Response({'results': results})
+
 class UserFavoriteViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = UserFavorite.objects.all()
     serializer_class = UserFavoriteSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
-        return UserFavorite.objects.filter(user=self.request.user)
+        return UserFavorite.objects.filter(user=self.request.user).select_related('book')
 
 class ReadingHistoryViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = ReadingHistory.objects.all()
     serializer_class = ReadingHistorySerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = LastReadCursorPagination
 
     def get_queryset(self):
-        return ReadingHistory.objects.filter(user=self.request.user)
+        return ReadingHistory.objects.filter(user=self.request.user).select_related('book')
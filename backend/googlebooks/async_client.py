@@ -0,0 +1,125 @@
+import asyncio
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from bookflix.profiling import upstream_call
+
+from .client import DEFAULT_CLIENT, SEARCH_FIELDS, VOLUME_FIELDS
+from .guard import get_upstream_guard, parse_retry_after
+
+try:
+    import httpx
+except ImportError:  # Only the async views need it
+    httpx = None
+
+
+class AsyncGoogleBooksClient:
+    """Non-blocking counterpart of GoogleBooksClient for the ASGI views.
+
+    One pooled ``httpx.AsyncClient`` is kept per event loop, so a single
+    process can hold many upstream calls in flight. The client is closed
+    when its loop shuts down: under WSGI / runserver every async view runs
+    on a fresh loop through ``async_to_sync``, which would otherwise leak a
+    client and its sockets per request.
+    """
+
+    def __init__(self, api_key=None, base_url=DEFAULT_CLIENT['BASE_URL'], pool_size=DEFAULT_CLIENT['POOL_SIZE'],
+                 connect_timeout=DEFAULT_CLIENT['CONNECT_TIMEOUT'], read_timeout=DEFAULT_CLIENT['READ_TIMEOUT'],
+                 transport=None, guard=None):
+        if httpx is None:
+            raise ImproperlyConfigured('The async Google Books views require the httpx package')
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.transport = transport
+        self.guard = guard
+        self._client = None
+        self._loop = None
+        self._closer = None
+
+    @classmethod
+    def from_settings(cls, **kwargs):
+        config = {**DEFAULT_CLIENT, **getattr(settings, 'GOOGLE_BOOKS_CLIENT', {})}
+        options = {
+            'api_key': settings.GOOGLE_BOOKS_API_KEY,
+            'base_url': config['BASE_URL'],
+            # Async connections are cheap, so allow more of them than the sync pool
+            'pool_size': config.get('ASYNC_POOL_SIZE', config['POOL_SIZE']),
+            'connect_timeout': config['CONNECT_TIMEOUT'],
+            'read_timeout': config['READ_TIMEOUT'],
+            'guard': get_upstream_guard(),
+        }
+        options.update(kwargs)
+        return cls(**options)
+
+    def _get_client(self):
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                headers={'Accept-Encoding': 'gzip', 'User-Agent': 'bookflix (gzip)'},
+                transport=self.transport,
+            )
+            self._client, self._loop = client, loop
+            self._closer = loop.create_task(self._close_with_loop(client))
+        return self._client
+
+    async def _close_with_loop(self, client):
+        # asyncio.run (and so async_to_sync) cancels pending tasks before closing
+        # the loop, so this closes the client while its loop can still run it
+        try:
+            await asyncio.get_running_loop().create_future()
+        finally:
+            if self._client is client:
+                self._client = self._loop = self._closer = None
+            await client.aclose()
+
+    async def get(self, path, params=None):
+        params = dict(params or {})
+        if self.api_key:
+            params['key'] = self.api_key
+        if self.guard is None:
+            with upstream_call():
+                response = await self._get_client().get(f'{self.base_url}{path}', params=params)
+        else:
+            await self.guard.aadmit()
+            try:
+                with upstream_call():
+                    response = await self._get_client().get(f'{self.base_url}{path}', params=params)
+            except httpx.TransportError:
+                await self.guard.arecord()
+                raise
+            await self.guard.arecord(response.status_code, parse_retry_after(response.headers.get('Retry-After')))
+        response.raise_for_status()
+        return response.json()
+
+    async def search(self, query, max_results=40, fields=SEARCH_FIELDS):
+        params = {'q': query, 'maxResults': max_results}
+        if fields:
+            params['fields'] = fields
+        return await self.get('/volumes', params)
+
+    async def volume(self, volume_id, fields=VOLUME_FIELDS):
+        params = {'fields': fields} if fields else {}
+        return await self.get(f'/volumes/{volume_id}', params)
+
+    async def aclose(self):
+        client, closer = self._client, self._closer
+        self._client = self._loop = self._closer = None
+        if closer is not None:
+            closer.cancel()
+        if client is not None:
+            await client.aclose()
+
+
+_async_client = None
+
+
+def get_async_client():
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncGoogleBooksClient.from_settings()
+    return _async_client
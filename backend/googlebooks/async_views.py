@@ -0,0 +1,196 @@
+"""Async (ASGI) variants of the Google Books proxy endpoints.
+
+They mirror GoogleBookViewSet.search / retrieve / download, but await the
+upstream call instead of blocking a worker thread on it. Database and
+serializer work stays synchronous and runs through ``sync_to_async``.
+"""
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .async_client import get_async_client, httpx
+from .cache import get_search_cache, normalize_search_query
+from .client import DETAIL_FIELDS
+from .guard import UpstreamUnavailable
+from .ingest import ingest_volumes
+from .models import GoogleBook
+from .refresh import get_refresh_config
+from .search_index import search_local
+from .serializers import GoogleBookSerializer
+from .singleflight import get_async_single_flight
+from .volume_cache import get_volume_cache
+from .views import VALID_DOWNLOAD_FORMATS, embed_includes, resolve_download, retry_after_headers
+
+logger = logging.getLogger(__name__)
+
+
+def _serialize(request, books, many):
+    # Authenticate the same way the DRF views do so is_favorited works
+    drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    drf_request.user  # Authenticate here so failures surface before serializing
+    data = GoogleBookSerializer(books, many=many, context={'request': drf_request}).data
+    if many:
+        return data
+    return embed_includes(data, request.GET.get('include'), drf_request.user)
+
+
+async def _respond(request, books, many=False):
+    try:
+        data = await sync_to_async(_serialize)(request, books, many)
+    except exceptions.AuthenticationFailed as auth_err:
+        return JsonResponse({'detail': str(auth_err.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+    return JsonResponse(data, safe=False)
+
+
+def _upstream_error(err, action):
+    if isinstance(err, httpx.TimeoutException):
+        logger.error('Request to Google Books API timed out')
+        return JsonResponse({'error': 'Request to Google Books API timed out'}, status=status.HTTP_504_GATEWAY_TIMEOUT)
+    if isinstance(err, httpx.HTTPStatusError):
+        logger.error(f'HTTP error occurred: {err}')
+        return JsonResponse({'error': f'Failed to fetch {action} from Google Books API'},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    logger.error(f'Connection error: {err}')
+    return JsonResponse({'error': 'Could not connect to Google Books API'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+def _upstream_unavailable(err):
+    logger.warning(f'Google Books request refused: {err}')
+    response = JsonResponse({'error': 'Google Books API is temporarily unavailable'},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    for header, value in retry_after_headers(err).items():
+        response[header] = value
+    return response
+
+
+def _api_key_missing():
+    logger.error('Google Books API key is not configured')
+    return JsonResponse({'error': 'Google Books API key is not configured'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+async def search(request):
+    category = request.GET.get('category')
+    query = request.GET.get('q', '')
+
+    if not query and not category:
+        return JsonResponse({'error': 'Query or category parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Build search query
+    search_query = query
+    if category:
+        search_query = f'subject:{category}' + (f' {query}' if query else '')
+
+    # Answer from the local catalog when it already has enough matches
+    local_search = getattr(settings, 'GOOGLE_BOOKS_LOCAL_SEARCH', {})
+    if local_search.get('ENABLED'):
+        local_books = await sync_to_async(search_local)(search_query, limit=40)
+        if len(local_books) >= local_search.get('MIN_RESULTS', 20):
+            return await _respond(request, local_books, many=True)
+
+    if not settings.GOOGLE_BOOKS_API_KEY:
+        return _api_key_missing()
+
+    client = get_async_client()
+
+    async def fetch():
+        search_cache = get_search_cache()
+        data = await sync_to_async(search_cache.get)(search_query)
+        if data is None:
+            data = await client.search(search_query, max_results=40)
+            await sync_to_async(search_cache.set)(search_query, data)
+        update_existing = get_refresh_config()['INLINE_UPDATES']
+        return await sync_to_async(ingest_volumes)(data.get('items', []), update_existing=update_existing)
+
+    # Concurrent requests for the same query share one upstream fetch
+    try:
+        books = await get_async_single_flight().do(f'search:{normalize_search_query(search_query)}', fetch)
+    except UpstreamUnavailable as err:
+        # Google is throttling us or down: answer from the local catalog instead
+        local_books = await sync_to_async(search_local)(search_query, limit=40)
+        if not local_books:
+            return _upstream_unavailable(err)
+        return await _respond(request, local_books, many=True)
+    except httpx.HTTPError as err:
+        return _upstream_error(err, 'data')
+
+    if not books:
+        logger.warning(f'No results found for query: {query}')
+        return JsonResponse([], safe=False)
+    return await _respond(request, books, many=True)
+
+
+async def retrieve(request, google_books_id):
+    book = await GoogleBook.objects.filter(google_books_id=google_books_id).afirst()
+    if book is None:
+        if not settings.GOOGLE_BOOKS_API_KEY:
+            return _api_key_missing()
+        client = get_async_client()
+
+        async def fetch():
+            item = await client.volume(google_books_id, fields=DETAIL_FIELDS)
+            await sync_to_async(get_volume_cache().store)(google_books_id, item)
+            if not item.get('volumeInfo'):
+                return None
+            item.setdefault('id', google_books_id)
+            books = await sync_to_async(ingest_volumes)([item])
+            return books[0] if books else None
+
+        # Concurrent requests for the same volume share one upstream fetch
+        try:
+            book = await get_async_single_flight().do(f'volume:{google_books_id}', fetch)
+        except UpstreamUnavailable as err:
+            return _upstream_unavailable(err)
+        except httpx.HTTPError as err:
+            return _upstream_error(err, 'data')
+        if book is None:
+            return JsonResponse({'error': 'Book information not available'}, status=status.HTTP_404_NOT_FOUND)
+        return await _respond(request, book)
+
+    response = await _respond(request, book)
+    if settings.GOOGLE_BOOKS_API_KEY:
+        # As the sync retrieve: serve the stored row now, refresh it in the background once stale
+        try:
+            await sync_to_async(get_volume_cache().revalidate_if_stale)(book.google_books_id, book.fetched_at)
+        except Exception as err:
+            logger.warning(f'Scheduling revalidation of volume {google_books_id} failed: {err}')
+    return response
+
+
+async def download(request, google_books_id):
+    book = await GoogleBook.objects.filter(google_books_id=google_books_id).afirst()
+    if book is None:
+        return JsonResponse({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+    format_type = request.GET.get('format', 'pdf')
+    if format_type not in VALID_DOWNLOAD_FORMATS:
+        return JsonResponse(
+            {'error': f'Invalid format. Supported formats: {", ".join(VALID_DOWNLOAD_FORMATS)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    if not settings.GOOGLE_BOOKS_API_KEY:
+        return _api_key_missing()
+    # Read accessInfo from the volume cache when possible
+    volume_cache = get_volume_cache()
+    data = await sync_to_async(volume_cache.get)(book.google_books_id)
+    if data is None:
+        client = get_async_client()
+        try:
+            data = await client.volume(book.google_books_id, fields=DETAIL_FIELDS)
+        except UpstreamUnavailable as err:
+            # Serve an expired entry rather than nothing while Google is unreachable
+            data = await sync_to_async(volume_cache.peek)(book.google_books_id)
+            if data is None:
+                return _upstream_unavailable(err)
+        except httpx.HTTPError as err:
+            return _upstream_error(err, 'download information')
+        else:
+            await sync_to_async(volume_cache.store)(book.google_books_id, data)
+
+    payload, status_code = resolve_download(data, format_type)
+    return JsonResponse(payload, status=status_code)
@@ -0,0 +1,160 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Defaults for settings.GOOGLE_BOOKS_SEARCH_CACHE
+DEFAULT_SEARCH_CACHE = {
+    'BACKEND': 'memory',  # 'memory' (per process) or 'django' (settings.CACHES)
+    'CACHE_ALIAS': 'default',
+    'TTL': 60 * 10,
+    'MAX_ENTRIES': 1024,
+    'KEY_PREFIX': 'googlebooks:search',
+}
+
+
+def normalize_search_query(search_query):
+    """Canonical form of a volumes query, used as the cache key.
+
+    Lowercases, collapses whitespace and moves ``subject:`` terms to the
+    front in sorted order, so ``"Potter  subject:Fiction"`` and
+    ``"subject:fiction potter"`` share one entry.
+    """
+    terms = (search_query or '').lower().split()
+    subjects = sorted(term for term in terms if term.startswith('subject:'))
+    rest = [term for term in terms if not term.startswith('subject:')]
+    return ' '.join(subjects + rest)
+
+
+class LocMemSearchBackend:
+    """In-process LRU store with per-entry expiry."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DjangoSearchBackend:
+    """Store entries in one of settings.CACHES so all workers share them.
+
+    Eviction is left to the cache server's own policy.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value, ttl):
+        self.cache.set(key, value, ttl)
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+    def clear(self):
+        self.cache.clear()
+
+
+class SearchCache:
+    """Caches upstream search payloads keyed by the normalized query."""
+
+    def __init__(self, backend, ttl, key_prefix=DEFAULT_SEARCH_CACHE['KEY_PREFIX']):
+        self.backend = backend
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        config = {**DEFAULT_SEARCH_CACHE, **getattr(settings, 'GOOGLE_BOOKS_SEARCH_CACHE', {})}
+        if config['BACKEND'] == 'django':
+            backend = DjangoSearchBackend(config['CACHE_ALIAS'])
+        elif config['BACKEND'] == 'memory':
+            backend = LocMemSearchBackend(config['MAX_ENTRIES'])
+        else:
+            raise ValueError(f"Unknown search cache backend: {config['BACKEND']}")
+        return cls(backend, config['TTL'], config['KEY_PREFIX'])
+
+    def make_key(self, search_query):
+        # Hash the normalized query so keys stay safe for memcached
+        digest = hashlib.sha1(normalize_search_query(search_query).encode('utf-8')).hexdigest()
+        return f'{self.key_prefix}:{digest}'
+
+    def get(self, search_query):
+        value = self.backend.get(self.make_key(search_query))
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, search_query, value):
+        self.backend.set(self.make_key(search_query), value, self.ttl)
+
+    def delete(self, search_query):
+        self.backend.delete(self.make_key(search_query))
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / total if total else 0.0,
+        }
+
+
+_search_cache = None
+
+
+def get_search_cache():
+    global _search_cache
+    if _search_cache is None:
+        _search_cache = SearchCache.from_settings()
+    return _search_cache
@@ -0,0 +1,163 @@
+import json
+from collections import namedtuple
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from django.conf import settings
+
+from bookflix.profiling import upstream_call
+
+from .guard import get_upstream_guard, parse_retry_after
+
+# Defaults for settings.GOOGLE_BOOKS_CLIENT
+DEFAULT_CLIENT = {
+    'BASE_URL': 'https://www.googleapis.com/books/v1',
+    'POOL_SIZE': 10,  # Keep-alive connections per worker process
+    'CONNECT_TIMEOUT': 3.05,
+    'READ_TIMEOUT': 10,
+}
+
+# Only the volumeInfo keys we map onto GoogleBook / Book rows
+VOLUME_INFO_FIELDS = (
+    'title,authors,description,imageLinks/thumbnail,previewLink,publishedDate,'
+    'industryIdentifiers,pageCount,categories,language'
+)
+SEARCH_FIELDS = f'totalItems,items(id,volumeInfo({VOLUME_INFO_FIELDS}))'
+VOLUME_FIELDS = f'id,volumeInfo({VOLUME_INFO_FIELDS})'
+DOWNLOAD_FIELDS = 'id,accessInfo(pdf,epub),volumeInfo/previewLink'
+# Everything retrieve and download need, stored by the volume detail cache
+DETAIL_FIELDS = f'id,volumeInfo({VOLUME_INFO_FIELDS}),accessInfo(pdf,epub)'
+
+# payload is None when the upstream answered 304 Not Modified
+VolumeResponse = namedtuple('VolumeResponse', ['payload', 'etag', 'not_modified'])
+
+
+class StubTransport(BaseAdapter):
+    """Transport adapter that answers from a local handler instead of the network.
+
+    ``handler(request)`` receives the prepared request and returns
+    ``(status_code, payload)`` or ``(status_code, payload, headers)``.
+    Used for offline benchmarks of the client.
+    """
+
+    def __init__(self, handler):
+        super().__init__()
+        self.handler = handler
+        self.calls = 0
+
+    def send(self, request, **kwargs):
+        self.calls += 1
+        result = self.handler(request)
+        status_code, payload = result[0], result[1]
+        headers = result[2] if len(result) > 2 else {}
+
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers = CaseInsensitiveDict({'Content-Type': 'application/json', **headers})
+        response._content = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class GoogleBooksClient:
+    """Pooled keep-alive client for the Google Books volumes API.
+
+    Raises the usual ``requests.exceptions`` errors so callers keep their
+    existing timeout / HTTP / connection error handling. With a ``guard``
+    every call goes through its rate limiter and circuit breaker first, and
+    refused calls raise ``guard.UpstreamUnavailable``.
+    """
+
+    def __init__(self, api_key=None, base_url=DEFAULT_CLIENT['BASE_URL'], pool_size=DEFAULT_CLIENT['POOL_SIZE'],
+                 connect_timeout=DEFAULT_CLIENT['CONNECT_TIMEOUT'], read_timeout=DEFAULT_CLIENT['READ_TIMEOUT'],
+                 transport=None, guard=None):
+        self.api_key = api_key
+        self.guard = guard
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Accept-Encoding': 'gzip',
+            # Google only compresses responses for user agents containing "gzip"
+            'User-Agent': 'bookflix (gzip)',
+        })
+        adapter = transport or HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @classmethod
+    def from_settings(cls, **kwargs):
+        config = {**DEFAULT_CLIENT, **getattr(settings, 'GOOGLE_BOOKS_CLIENT', {})}
+        options = {
+            'api_key': settings.GOOGLE_BOOKS_API_KEY,
+            'base_url': config['BASE_URL'],
+            'pool_size': config['POOL_SIZE'],
+            'connect_timeout': config['CONNECT_TIMEOUT'],
+            'read_timeout': config['READ_TIMEOUT'],
+            'guard': get_upstream_guard(),
+        }
+        options.update(kwargs)
+        return cls(**options)
+
+    def request(self, path, params=None, headers=None):
+        params = dict(params or {})
+        if self.api_key:
+            params['key'] = self.api_key
+        if self.guard is None:
+            with upstream_call():
+                response = self.session.get(f'{self.base_url}{path}', params=params, headers=headers,
+                                            timeout=self.timeout)
+        else:
+            self.guard.admit()
+            try:
+                with upstream_call():
+                    response = self.session.get(f'{self.base_url}{path}', params=params, headers=headers,
+                                                timeout=self.timeout)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+                self.guard.record()
+                raise
+            self.guard.record(response.status_code, parse_retry_after(response.headers.get('Retry-After')))
+        response.raise_for_status()
+        return response
+
+    def get(self, path, params=None):
+        return self.request(path, params).json()
+
+    def search(self, query, max_results=40, fields=SEARCH_FIELDS):
+        params = {'q': query, 'maxResults': max_results}
+        if fields:
+            params['fields'] = fields
+        return self.get('/volumes', params)
+
+    def volume(self, volume_id, fields=VOLUME_FIELDS):
+        params = {'fields': fields} if fields else {}
+        return self.get(f'/volumes/{volume_id}', params)
+
+    def volume_conditional(self, volume_id, etag=None, fields=DETAIL_FIELDS):
+        """Fetch a volume, revalidating with If-None-Match when an ETag is known."""
+        params = {'fields': fields} if fields else {}
+        headers = {'If-None-Match': etag} if etag else None
+        response = self.request(f'/volumes/{volume_id}', params, headers)
+        if response.status_code == 304:
+            return VolumeResponse(None, etag, True)
+        return VolumeResponse(response.json(), response.headers.get('ETag', ''), False)
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = GoogleBooksClient.from_settings()
+    return _client
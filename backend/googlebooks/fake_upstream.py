@@ -0,0 +1,93 @@
+"""A local stand-in for the Google Books volumes API, for load tests.
+
+Serves deterministic volumes for ``/books/v1/volumes?q=`` and
+``/books/v1/volumes/<id>`` with configurable latency, so proxy
+throughput can be measured without touching Google or the API quota.
+It can also answer a share of requests with 429 and add latency spikes,
+to exercise the upstream guard (googlebooks/guard.py).
+Point GOOGLE_BOOKS_API_URL at ``http://127.0.0.1:<port>/books/v1``.
+"""
+import json
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+VOLUME_PATH = re.compile(r'^/books/v1/volumes/(?P<volume_id>[^/]+)$')
+
+
+def make_volume(volume_id):
+    number = sum(ord(char) for char in volume_id)
+    return {
+        'id': volume_id,
+        'volumeInfo': {
+            'title': f'Fake Volume {volume_id}',
+            'authors': [f'Author {number % 97}'],
+            'description': 'Generated by the fake Google Books server.',
+            'publishedDate': str(1950 + number % 70),
+            'industryIdentifiers': [{'type': 'ISBN_13', 'identifier': f'978{number:010d}'[:13]}],
+            'imageLinks': {'thumbnail': f'http://books.example.com/{volume_id}.jpg'},
+            'previewLink': f'http://books.example.com/{volume_id}',
+            'pageCount': 100 + number % 400,
+            'categories': ['Fiction'],
+            'language': 'en',
+        },
+        'accessInfo': {'pdf': {'isAvailable': False}, 'epub': {'isAvailable': False}},
+    }
+
+
+class FakeGoogleBooksHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real API
+    latency = 0.0
+    throttle_rate = 0.0  # Share of requests answered with 429
+    retry_after = 0
+    spike_rate = 0.0  # Share of requests delayed by spike_latency instead
+    spike_latency = 0.0
+
+    def do_GET(self):
+        spike = random.random() < self.spike_rate
+        time.sleep(self.spike_latency if spike else self.latency)
+        if random.random() < self.throttle_rate:
+            headers = {'Retry-After': str(self.retry_after)} if self.retry_after else {}
+            self.send_json(429, {'error': {'code': 429, 'message': 'Rate Limit Exceeded'}}, headers)
+            return
+        url = urlparse(self.path)
+        match = VOLUME_PATH.match(url.path)
+        if match:
+            self.send_json(200, make_volume(match.group('volume_id')))
+        elif url.path == '/books/v1/volumes':
+            query = parse_qs(url.query).get('q', [''])[0]
+            max_results = int(parse_qs(url.query).get('maxResults', ['10'])[0])
+            slug = re.sub(r'\W+', '-', query.lower()).strip('-') or 'all'
+            items = [make_volume(f'{slug}-{i}') for i in range(max_results)]
+            self.send_json(200, {'totalItems': len(items), 'items': items})
+        else:
+            self.send_json(404, {'error': {'code': 404, 'message': 'Not Found'}})
+
+    def send_json(self, status_code, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host='127.0.0.1', port=8765, latency=0.0, throttle_rate=0.0, retry_after=0,
+                spike_rate=0.0, spike_latency=0.0):
+    handler = type('ConfiguredFakeGoogleBooksHandler', (FakeGoogleBooksHandler,), {
+        'latency': latency,
+        'throttle_rate': throttle_rate,
+        'retry_after': retry_after,
+        'spike_rate': spike_rate,
+        'spike_latency': spike_latency,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
@@ -0,0 +1,251 @@
+"""Upstream guard: rate limiting and circuit breaking for Google Books calls.
+
+The token bucket keeps us inside the API key's quota, and the circuit
+breaker stops sending requests once Google throttles us or times out, so
+workers fail fast instead of each waiting out the read timeout. Both share
+their state through a Django cache when CACHE_ALIAS is set, otherwise they
+are per process.
+"""
+import asyncio
+import threading
+import time
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+# Defaults for settings.GOOGLE_BOOKS_UPSTREAM_GUARD
+DEFAULT_UPSTREAM_GUARD = {
+    'CACHE_ALIAS': None,  # Set to a cache shared by all workers to enforce one quota
+    'RATE': 10.0,  # Requests per second, sized to the API key quota
+    'BURST': 20,
+    'MAX_WAIT': 0.5,  # Longest a request waits for a token before failing fast
+    'FAILURE_THRESHOLD': 5,  # Consecutive timeouts / 429s / 5xx that open the breaker
+    'RESET_TIMEOUT': 30,  # Seconds the breaker stays open before a probe request
+    'KEY_PREFIX': 'googlebooks:upstream',
+}
+
+
+class UpstreamUnavailable(requests.exceptions.ConnectionError):
+    """Raised instead of calling Google when the guard refuses a request."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpen(UpstreamUnavailable):
+    pass
+
+
+class RateLimited(UpstreamUnavailable):
+    pass
+
+
+def parse_retry_after(value):
+    """Seconds from a Retry-After header; HTTP-date values are ignored."""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Token bucket of ``burst`` tokens refilled at ``rate`` per second.
+
+    In process it is an exact bucket. With a shared cache it becomes a
+    counter per window of ``burst / rate`` seconds, since ``incr`` is the
+    only atomic operation every cache backend offers; the long-run rate and
+    the burst size stay the same.
+    """
+
+    def __init__(self, rate, burst, cache=None, key_prefix=DEFAULT_UPSTREAM_GUARD['KEY_PREFIX']):
+        self.rate = rate
+        self.burst = burst
+        self.cache = cache
+        self.key_prefix = key_prefix
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """Take a token; returns 0 on success, else the seconds until one is due."""
+        if self.cache is not None:
+            return self._try_acquire_shared()
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def _try_acquire_shared(self):
+        window = self.burst / self.rate
+        now = time.time()
+        slot = int(now // window)
+        key = f'{self.key_prefix}:tokens:{slot}'
+        self.cache.add(key, 0, int(window) + 1)
+        try:
+            used = self.cache.incr(key)
+        except ValueError:
+            # The window expired between add and incr
+            self.cache.add(key, 1, int(window) + 1)
+            used = 1
+        if used <= self.burst:
+            return 0
+        return (slot + 1) * window - now
+
+
+class CircuitBreaker:
+    """Closed -> open after ``failure_threshold`` consecutive failures.
+
+    Once ``reset_timeout`` has passed a single probe request is let through
+    (half-open); its outcome closes the breaker or opens it again.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout, cache, key_prefix=DEFAULT_UPSTREAM_GUARD['KEY_PREFIX']):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.cache = cache
+        self.failures_key = f'{key_prefix}:breaker:failures'
+        self.open_until_key = f'{key_prefix}:breaker:open_until'
+        self.probe_key = f'{key_prefix}:breaker:probe'
+
+    def state(self):
+        open_until = self.cache.get(self.open_until_key)
+        if open_until is None:
+            return 'closed'
+        return 'open' if time.time() < open_until else 'half_open'
+
+    def retry_after(self):
+        open_until = self.cache.get(self.open_until_key)
+        return max(0.0, open_until - time.time()) if open_until else None
+
+    def allow(self):
+        """Whether a call may go out; in the half-open state this takes the single probe slot."""
+        state = self.state()
+        if state == 'closed':
+            return True
+        if state == 'open':
+            return False
+        # Half-open: only the first caller gets to probe
+        return self.cache.add(self.probe_key, 1, self.reset_timeout)
+
+    def record_success(self):
+        if self.cache.get(self.open_until_key) is not None:
+            self.cache.delete_many([self.open_until_key, self.probe_key])
+        self.cache.delete(self.failures_key)
+
+    def record_failure(self, retry_after=None):
+        if retry_after or self.state() == 'half_open':
+            # Google told us when to come back, or the probe failed
+            self.trip(retry_after)
+            return
+        self.cache.add(self.failures_key, 0, self.reset_timeout * 10)
+        try:
+            failures = self.cache.incr(self.failures_key)
+        except ValueError:
+            failures = 1
+        if failures >= self.failure_threshold:
+            self.trip()
+
+    def trip(self, retry_after=None):
+        duration = max(self.reset_timeout, retry_after or 0)
+        # Keep the marker past open_until so the half-open state can be seen
+        self.cache.set(self.open_until_key, time.time() + duration, int(duration) + self.reset_timeout * 10)
+        self.cache.delete_many([self.failures_key, self.probe_key])
+
+
+class UpstreamGuard:
+    """Admits upstream calls through the breaker and the bucket, and records their outcome."""
+
+    def __init__(self, bucket, breaker, max_wait):
+        self.bucket = bucket
+        self.breaker = breaker
+        self.max_wait = max_wait
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        config = {**DEFAULT_UPSTREAM_GUARD, **getattr(settings, 'GOOGLE_BOOKS_UPSTREAM_GUARD', {})}
+        if config['CACHE_ALIAS']:
+            cache = caches[config['CACHE_ALIAS']]
+            bucket = TokenBucket(config['RATE'], config['BURST'], cache, config['KEY_PREFIX'])
+        else:
+            cache = LocMemCache(config['KEY_PREFIX'], {})
+            bucket = TokenBucket(config['RATE'], config['BURST'], key_prefix=config['KEY_PREFIX'])
+        breaker = CircuitBreaker(config['FAILURE_THRESHOLD'], config['RESET_TIMEOUT'], cache, config['KEY_PREFIX'])
+        return cls(bucket, breaker, config['MAX_WAIT'])
+
+    def is_open(self):
+        return self.breaker.state() == 'open'
+
+    def _refuse(self, retry_after):
+        self._reject()
+        raise CircuitOpen('Google Books circuit breaker is open', retry_after)
+
+    def _reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def _over_budget(self, wait, waited, max_wait):
+        budget = self.max_wait if max_wait is None else max_wait
+        if waited + wait > budget:
+            self._reject()
+            raise RateLimited('Google Books request quota exhausted', wait)
+
+    def admit(self, max_wait=None):
+        """Block until a call may go out, or raise CircuitOpen / RateLimited.
+
+        An open breaker fails fast. The half-open probe slot is only taken
+        once a token is in hand, so a rate-limited caller never holds it.
+        """
+        if self.is_open():
+            self._refuse(self.breaker.retry_after())
+        waited = 0.0
+        while wait := self.bucket.try_acquire():
+            self._over_budget(wait, waited, max_wait)
+            time.sleep(wait)
+            waited += wait
+        if not self.breaker.allow():
+            self._refuse(self.breaker.retry_after())
+
+    async def aadmit(self, max_wait=None):
+        """Non-blocking variant of admit() for the async client; cache calls run in a thread."""
+        if await sync_to_async(self.is_open)():
+            self._refuse(await sync_to_async(self.breaker.retry_after)())
+        waited = 0.0
+        while wait := await sync_to_async(self.bucket.try_acquire)():
+            self._over_budget(wait, waited, max_wait)
+            await asyncio.sleep(wait)
+            waited += wait
+        if not await sync_to_async(self.breaker.allow)():
+            self._refuse(await sync_to_async(self.breaker.retry_after)())
+
+    def record(self, status_code=None, retry_after=None):
+        """Record a finished call; ``status_code`` is None for timeouts and connection errors."""
+        if status_code is None or status_code == 429 or status_code >= 500:
+            self.breaker.record_failure(retry_after if status_code == 429 else None)
+        else:
+            self.breaker.record_success()
+
+    async def arecord(self, status_code=None, retry_after=None):
+        await sync_to_async(self.record)(status_code, retry_after)
+
+    def stats(self):
+        return {'state': self.breaker.state(), 'rejected': self.rejected}
+
+
+_upstream_guard = None
+
+
+def get_upstream_guard():
+    global _upstream_guard
+    if _upstream_guard is None:
+        _upstream_guard = UpstreamGuard.from_settings()
+    return _upstream_guard
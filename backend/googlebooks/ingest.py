@@ -0,0 +1,101 @@
+import logging
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+
+from .models import GoogleBook
+from .normalize import GOOGLE_BOOK_FIELDS, normalize_volumes, to_records
+
+logger = logging.getLogger(__name__)
+
+
+def _clean(field, value):
+    value = field.to_python(value)
+    # Missing URLs / text go in as '' on non-nullable string columns
+    if value is None and not field.null and field.empty_strings_allowed:
+        return ''
+    # One over-long value would fail the whole bulk write with a DataError on PostgreSQL
+    if isinstance(value, str) and field.max_length and len(value) > field.max_length:
+        if isinstance(field, models.URLField):
+            # A cut URL is broken; store none
+            return None if field.null else ''
+        return value[:field.max_length]
+    return value
+
+
+def upsert_books(records, model=GoogleBook, key='google_books_id', update_existing=True):
+    """Write a batch of mapped volume records in a single transaction.
+
+    Existing rows are loaded with one ``IN`` query; new rows go through
+    ``bulk_create`` and existing rows through ``bulk_update``, touching only
+    rows where a non-empty incoming value differs from the stored one.
+    With ``update_existing=False`` existing rows are returned untouched.
+    Returns the model instances in the order of ``records``.
+    """
+    prepared = {}
+    for record in records:
+        try:
+            values = {name: _clean(model._meta.get_field(name), value) for name, value in record.items()}
+        except ValidationError as err:
+            logger.error(f'Skipping invalid book record {record.get(key)}: {err}')
+            continue
+        prepared.setdefault(values[key], {}).update(values)
+
+    if not prepared:
+        return []
+
+    try:
+        return _write_books(prepared, model, key, update_existing)
+    except IntegrityError:
+        # Another worker inserted some of these rows first; they now exist, so retry as updates
+        logger.info(f'Concurrent insert detected for {model.__name__}, retrying upsert')
+        return _write_books(prepared, model, key, update_existing)
+
+
+def _write_books(prepared, model, key, update_existing):
+    stamped = any(field.name == 'fetched_at' for field in model._meta.fields)
+    now = timezone.now()
+    to_create, to_update, changed_fields = [], [], set()
+    with transaction.atomic():
+        books = model.objects.in_bulk(list(prepared), field_name=key)
+        for key_value, values in prepared.items():
+            book = books.get(key_value)
+            if book is None:
+                book = books[key_value] = model(**values)
+                if stamped:
+                    book.fetched_at = now
+                to_create.append(book)
+                continue
+            if not update_existing:
+                continue
+
+            dirty = False
+            for name, value in values.items():
+                # Only update if value is not empty, as the per-item path did
+                if value and getattr(book, name) != value:
+                    setattr(book, name, value)
+                    changed_fields.add(name)
+                    dirty = True
+            if dirty:
+                if stamped:
+                    book.fetched_at = now
+                    changed_fields.add('fetched_at')
+                to_update.append(book)
+
+        if to_create:
+            model.objects.bulk_create(to_create)
+        if to_update:
+            model.objects.bulk_update(to_update, sorted(changed_fields))
+
+    # Backends that can't return ids from a bulk insert need one more read
+    if any(book.pk is None for book in to_create):
+        created = model.objects.in_bulk([getattr(book, key) for book in to_create], field_name=key)
+        books.update(created)
+
+    return [books[key_value] for key_value in prepared]
+
+
+def ingest_volumes(items, model=GoogleBook, field_map=GOOGLE_BOOK_FIELDS, update_existing=True):
+    """Normalize a page of volumes and upsert them; returns rows in input order."""
+    return upsert_books(to_records(normalize_volumes(items), field_map), model=model, update_existing=update_existing)
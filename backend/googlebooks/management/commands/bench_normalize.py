@@ -0,0 +1,47 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from googlebooks.fake_upstream import make_volume
+from googlebooks.normalize import normalize_volumes, to_records
+
+
+class Command(BaseCommand):
+    help = 'Measure volume normalization throughput (items/sec) on captured or generated payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('payloads', nargs='*',
+                            help='Captured volumes responses (JSON with "items") or NDJSON volume dumps')
+        parser.add_argument('--items', type=int, default=100_000, help='Generated items when no payload is given')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        items = self.load(options['payloads']) if options['payloads'] else [
+            make_volume(f'bench-{i}') for i in range(options['items'])
+        ]
+        self.stdout.write(f'{len(items)} items, best of {options["repeat"]} runs')
+
+        best_columns = best_records = float('inf')
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            columns = normalize_volumes(items)
+            normalized = time.perf_counter()
+            to_records(columns)
+            finished = time.perf_counter()
+            best_columns = min(best_columns, normalized - started)
+            best_records = min(best_records, finished - started)
+
+        self.stdout.write(f'normalize_volumes:          {len(items) / best_columns:>12,.0f} items/sec')
+        self.stdout.write(f'normalize_volumes + records: {len(items) / best_records:>11,.0f} items/sec')
+
+    def load(self, paths):
+        items = []
+        for path in paths:
+            with open(path, encoding='utf-8') as handle:
+                text = handle.read()
+            try:
+                items.extend(json.loads(text).get('items', []))
+            except ValueError:
+                items.extend(json.loads(line) for line in text.splitlines() if line.strip())
+        return items
@@ -0,0 +1,94 @@
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from googlebooks.client import GoogleBooksClient
+from googlebooks.fake_upstream import make_server
+from googlebooks.guard import CircuitBreaker, TokenBucket, UpstreamGuard, UpstreamUnavailable
+
+
+class Command(BaseCommand):
+    help = 'Compare the Google Books client with and without the upstream guard against a throttling fake upstream'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--latency-ms', type=float, default=50)
+        parser.add_argument('--throttle-rate', type=float, default=0.3, help='Share of upstream 429s')
+        parser.add_argument('--spike-rate', type=float, default=0.1, help='Share of upstream latency spikes')
+        parser.add_argument('--spike-ms', type=float, default=3000)
+        parser.add_argument('--timeout', type=float, default=2, help='Client read timeout in seconds')
+        parser.add_argument('--rate', type=float, default=50, help='Guard token bucket rate per second')
+        parser.add_argument('--burst', type=int, default=20)
+        parser.add_argument('--failure-threshold', type=int, default=5)
+        parser.add_argument('--reset-timeout', type=int, default=5)
+
+    def handle(self, *args, **options):
+        server = make_server(
+            port=0, latency=options['latency_ms'] / 1000, throttle_rate=options['throttle_rate'],
+            spike_rate=options['spike_rate'], spike_latency=options['spike_ms'] / 1000,
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_address[1]}/books/v1'
+
+        try:
+            self.stdout.write(
+                f"{'client':<10} {'seconds':>8} {'p50 ms':>8} {'p99 ms':>8} "
+                f"{'ok':>5} {'failed':>7} {'refused':>8} {'upstream':>9}"
+            )
+            for label, guard in (('plain', None), ('guarded', self.make_guard(options))):
+                client = GoogleBooksClient(base_url=base_url, pool_size=options['concurrency'],
+                                           read_timeout=options['timeout'], guard=guard)
+                result = self.run(client, options['requests'], options['concurrency'])
+                client.close()
+                self.stdout.write(
+                    f"{label:<10} {result['seconds']:>8.2f} {result['p50']:>8.1f} {result['p99']:>8.1f} "
+                    f"{result['ok']:>5} {result['failed']:>7} {result['refused']:>8} "
+                    f"{result['ok'] + result['failed']:>9}"
+                )
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def make_guard(self, options):
+        cache = LocMemCache(f'bench-upstream-guard-{uuid.uuid4().hex}', {})
+        bucket = TokenBucket(options['rate'], options['burst'])
+        breaker = CircuitBreaker(options['failure_threshold'], options['reset_timeout'], cache)
+        return UpstreamGuard(bucket, breaker, max_wait=0.5)
+
+    def run(self, client, total, concurrency):
+        latencies = []
+        counts = {'ok': 0, 'failed': 0, 'refused': 0}
+        lock = threading.Lock()
+
+        def call(i):
+            started = time.perf_counter()
+            try:
+                client.volume(f'bench-{i}')
+                outcome = 'ok'
+            except UpstreamUnavailable:
+                outcome = 'refused'
+            except requests.exceptions.RequestException:
+                outcome = 'failed'
+            with lock:
+                counts[outcome] += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(call, range(total)))
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            'seconds': elapsed,
+            'p50': statistics.median(latencies),
+            'p99': latencies[max(0, int(len(latencies) * 0.99) - 1)],
+            **counts,
+        }
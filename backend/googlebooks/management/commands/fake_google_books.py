@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from googlebooks.fake_upstream import make_server
+
+
+class Command(BaseCommand):
+    help = 'Run a local fake Google Books API for offline load tests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency-ms', type=float, default=200, help='Delay added to every response')
+        parser.add_argument('--throttle-rate', type=float, default=0.0, help='Share of requests answered with 429')
+        parser.add_argument('--retry-after', type=int, default=0, help='Retry-After seconds sent with 429s')
+        parser.add_argument('--spike-rate', type=float, default=0.0, help='Share of requests hit by a latency spike')
+        parser.add_argument('--spike-ms', type=float, default=15000, help='Latency of a spike')
+
+    def handle(self, *args, **options):
+        server = make_server(
+            options['host'], options['port'], options['latency_ms'] / 1000,
+            throttle_rate=options['throttle_rate'], retry_after=options['retry_after'],
+            spike_rate=options['spike_rate'], spike_latency=options['spike_ms'] / 1000,
+        )
+        self.stdout.write(
+            f"Fake Google Books API on http://{options['host']}:{options['port']}/books/v1 "
+            f"({options['latency_ms']:.0f} ms latency)"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
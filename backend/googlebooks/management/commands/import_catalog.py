@@ -0,0 +1,107 @@
+import itertools
+import json
+import os
+import time
+from collections import deque
+from multiprocessing import Pool
+
+from django.core.management.base import BaseCommand, CommandError
+
+from googlebooks.ingest import upsert_books
+from googlebooks.normalize import normalize_volumes, to_records
+
+
+def parse_chunk(lines):
+    """Parse and normalize one chunk of NDJSON lines (runs in worker processes too)."""
+    items = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            items.append(json.loads(line))
+        except ValueError:
+            continue
+    return to_records(normalize_volumes(items)), len(lines)
+
+
+def parse_in_pool(pool, chunks, in_flight):
+    """Parse chunks in ``pool`` with at most ``in_flight`` pending, yielding results in file order.
+
+    ``Pool.imap`` would read the whole file ahead of the workers; this keeps
+    memory bounded while still returning chunks in order, so the checkpoint
+    stays a clean prefix of the file.
+    """
+    pending = deque()
+    for lines in chunks:
+        pending.append(pool.apply_async(parse_chunk, (lines,)))
+        if len(pending) >= in_flight:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def read_chunks(handle, chunk_size):
+    while True:
+        lines = list(itertools.islice(handle, chunk_size))
+        if not lines:
+            return
+        yield lines
+
+
+class Command(BaseCommand):
+    help = 'Stream a JSONL/NDJSON dump of Google Books volume objects into the GoogleBook catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Dump file with one volume object per line')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Volumes per bulk write')
+        parser.add_argument('--workers', type=int, default=0, help='Parallel parsing processes (0 parses inline)')
+        parser.add_argument('--checkpoint', help='File recording the number of lines already imported')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint')
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options['path']):
+            raise CommandError(f"No such file: {options['path']}")
+
+        checkpoint = options['checkpoint']
+        start_line = 0
+        if checkpoint and not options['restart'] and os.path.exists(checkpoint):
+            with open(checkpoint) as handle:
+                start_line = int(handle.read().strip() or 0)
+            self.stdout.write(f'Resuming after line {start_line}')
+
+        done_lines, rows = start_line, 0
+        started = time.perf_counter()
+        with open(options['path'], encoding='utf-8') as handle:
+            # Skip what a previous run already imported
+            for _ in itertools.islice(handle, start_line):
+                pass
+            chunks = read_chunks(handle, options['chunk_size'])
+
+            pool = Pool(options['workers']) if options['workers'] > 0 else None
+            try:
+                parsed = parse_in_pool(pool, chunks, 2 * options['workers']) if pool else map(parse_chunk, chunks)
+                for records, line_count in parsed:
+                    upsert_books(records)
+                    done_lines += line_count
+                    rows += len(records)
+                    if checkpoint:
+                        self.write_checkpoint(checkpoint, done_lines)
+                    elapsed = time.perf_counter() - started
+                    self.stdout.write(f'{done_lines} lines, {rows} rows, {rows / elapsed:,.0f} rows/sec')
+            finally:
+                if pool:
+                    pool.close()
+                    pool.join()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {rows} rows in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:,.0f} rows/sec)'
+        ))
+
+    def write_checkpoint(self, path, line):
+        # Write then rename so a crash never leaves a truncated checkpoint
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w') as handle:
+            handle.write(str(line))
+        os.replace(temp_path, path)
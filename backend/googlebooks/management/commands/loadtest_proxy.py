@@ -0,0 +1,62 @@
+import asyncio
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from googlebooks.async_client import httpx
+
+
+class Command(BaseCommand):
+    help = 'Fire concurrent requests at one or more proxy URLs and report throughput and latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help='e.g. the WSGI and ASGI search URLs of running servers')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=100)
+        parser.add_argument('--unique-queries', action='store_true',
+                            help='Append a distinct q= to each request so caches cannot absorb the load')
+
+    def handle(self, *args, **options):
+        if httpx is None:
+            raise CommandError('loadtest_proxy requires the httpx package')
+        self.stdout.write(f"{'url':<60} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+        for url in options['urls']:
+            result = asyncio.run(self.run(url, options['requests'], options['concurrency'], options['unique_queries']))
+            self.stdout.write(
+                f"{url:<60} {result['rps']:>8.1f} {result['p50']:>8.1f} {result['p95']:>8.1f} {result['errors']:>7}"
+            )
+
+    async def run(self, url, total, concurrency, unique_queries):
+        latencies, errors = [], 0
+        queue = asyncio.Queue()
+        for i in range(total):
+            queue.put_nowait(i)
+
+        async def worker(client):
+            nonlocal errors
+            while not queue.empty():
+                i = queue.get_nowait()
+                params = {'q': f'loadtest {i}'} if unique_queries else None
+                started = time.perf_counter()
+                try:
+                    response = await client.get(url, params=params)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(timeout=30, limits=limits) as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            'rps': total / elapsed,
+            'p50': statistics.median(latencies),
+            'p95': latencies[int(len(latencies) * 0.95) - 1],
+            'errors': errors,
+        }
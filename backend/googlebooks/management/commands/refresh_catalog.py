@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from googlebooks.refresh import CatalogRefresher, get_refresh_config
+
+
+class Command(BaseCommand):
+    help = 'Refresh GoogleBook rows older than the TTL from Google Books, off the request path'
+
+    def add_arguments(self, parser):
+        config = get_refresh_config()
+        parser.add_argument('--ttl', type=int, default=config['TTL'], help='Row age in seconds before refreshing')
+        parser.add_argument('--retry-after', type=int, default=config['RETRY_AFTER'],
+                            help='Seconds a row whose refresh failed waits before the next attempt')
+        parser.add_argument('--batch-size', type=int, default=config['BATCH_SIZE'])
+        parser.add_argument('--workers', type=int, default=config['WORKERS'], help='Refresh threads')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Keep running, sleeping N seconds when no rows are due (0 drains once)')
+
+    def handle(self, *args, **options):
+        refresher = CatalogRefresher(
+            options['ttl'], options['batch_size'], options['workers'], options['retry_after']
+        )
+        while True:
+            started = time.perf_counter()
+            batch = refresher.run_once()
+            metrics = refresher.metrics
+            if batch['queued']:
+                self.stdout.write(
+                    f"Refreshed {batch['refreshed']}/{batch['queued']} rows "
+                    f"in {time.perf_counter() - started:.1f}s | "
+                    f"queue depth {metrics['queue_depth']}, lag {metrics['refresh_lag_seconds']:.0f}s, "
+                    f"upstream calls {metrics['upstream_calls']} ({metrics['not_modified']} not modified), "
+                    f"saved {metrics['upstream_calls_saved']}, "
+                    f"deferred {batch['deferred']}, failed {batch['failed']}"
+                )
+                if batch['deferred'] < batch['queued']:
+                    continue
+                # Every row was deferred: the upstream is throttling us or the breaker is open
+                if not options['interval']:
+                    self.stdout.write(f"Upstream unavailable; {batch['deferred']} rows deferred to the next run")
+                    break
+            elif not options['interval']:
+                self.stdout.write(
+                    f"Nothing left to refresh ({metrics['deferred']} deferred, {metrics['failed']} failed)"
+                )
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,79 @@
+# Generated by Django 4.2.19 on 2026-10-18 10:05
+
+import logging
+
+from django.db import migrations
+
+logger = logging.getLogger(__name__)
+
+# DDL frozen as of this migration; later changes to googlebooks.search_index
+# need a migration of their own.
+SQLITE_CREATE = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS googlebooks_googlebook_fts USING fts5(
+        title, authors, description, categories, isbn,
+        content='googlebooks_googlebook', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS googlebooks_googlebook_fts_ai AFTER INSERT ON googlebooks_googlebook BEGIN
+        INSERT INTO googlebooks_googlebook_fts(rowid, title, authors, description, categories, isbn)
+        VALUES (new.id, new.title, new.authors, new.description, new.categories, new.isbn);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS googlebooks_googlebook_fts_ad AFTER DELETE ON googlebooks_googlebook BEGIN
+        INSERT INTO googlebooks_googlebook_fts(googlebooks_googlebook_fts, rowid, title, authors, description, categories, isbn)
+        VALUES ('delete', old.id, old.title, old.authors, old.description, old.categories, old.isbn);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS googlebooks_googlebook_fts_au AFTER UPDATE ON googlebooks_googlebook BEGIN
+        INSERT INTO googlebooks_googlebook_fts(googlebooks_googlebook_fts, rowid, title, authors, description, categories, isbn)
+        VALUES ('delete', old.id, old.title, old.authors, old.description, old.categories, old.isbn);
+        INSERT INTO googlebooks_googlebook_fts(rowid, title, authors, description, categories, isbn)
+        VALUES (new.id, new.title, new.authors, new.description, new.categories, new.isbn);
+    END""",
+    "INSERT INTO googlebooks_googlebook_fts(googlebooks_googlebook_fts) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS googlebooks_googlebook_fts_ai',
+    'DROP TRIGGER IF EXISTS googlebooks_googlebook_fts_ad',
+    'DROP TRIGGER IF EXISTS googlebooks_googlebook_fts_au',
+    'DROP TABLE IF EXISTS googlebooks_googlebook_fts',
+]
+PG_CREATE = [
+    "CREATE INDEX IF NOT EXISTS googlebooks_googlebook_search_idx ON googlebooks_googlebook USING GIN "
+    "(to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(authors, '') || ' ' || "
+    "coalesce(description, '') || ' ' || coalesce(categories, '') || ' ' || coalesce(isbn, '')))",
+]
+PG_DROP = ['DROP INDEX IF EXISTS googlebooks_googlebook_search_idx']
+
+
+def forwards(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute('PRAGMA compile_options')
+            if not any(row[0] == 'ENABLE_FTS5' for row in cursor.fetchall()):
+                logger.warning('SQLite was built without FTS5; local search will use LIKE queries')
+                return
+            statements = SQLITE_CREATE
+        elif vendor == 'postgresql':
+            statements = PG_CREATE
+        else:
+            return
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def backwards(apps, schema_editor):
+    statements = {'sqlite': SQLITE_DROP, 'postgresql': PG_DROP}.get(schema_editor.connection.vendor, [])
+    with schema_editor.connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('googlebooks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.19 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('googlebooks', '0002_googlebook_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GoogleVolumeCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('google_books_id', models.CharField(max_length=100, unique=True)),
+                ('payload', models.JSONField()),
+                ('etag', models.CharField(blank=True, max_length=255)),
+                ('fetched_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.19 on 2026-10-18 12:02
+
+from django.db import migrations, models
+
+# DDL frozen as of this migration: the update trigger fires only for indexed
+# columns, so fetched_at bumps don't rewrite the full-text index.
+RESTRICTED_UPDATE_TRIGGER = """CREATE TRIGGER IF NOT EXISTS googlebooks_googlebook_fts_au
+    AFTER UPDATE OF title, authors, description, categories, isbn ON googlebooks_googlebook BEGIN
+        INSERT INTO googlebooks_googlebook_fts(googlebooks_googlebook_fts, rowid, title, authors, description, categories, isbn)
+        VALUES ('delete', old.id, old.title, old.authors, old.description, old.categories, old.isbn);
+        INSERT INTO googlebooks_googlebook_fts(rowid, title, authors, description, categories, isbn)
+        VALUES (new.id, new.title, new.authors, new.description, new.categories, new.isbn);
+    END"""
+# The trigger created by 0002_googlebook_search_index
+UNRESTRICTED_UPDATE_TRIGGER = """CREATE TRIGGER IF NOT EXISTS googlebooks_googlebook_fts_au
+    AFTER UPDATE ON googlebooks_googlebook BEGIN
+        INSERT INTO googlebooks_googlebook_fts(googlebooks_googlebook_fts, rowid, title, authors, description, categories, isbn)
+        VALUES ('delete', old.id, old.title, old.authors, old.description, old.categories, old.isbn);
+        INSERT INTO googlebooks_googlebook_fts(rowid, title, authors, description, categories, isbn)
+        VALUES (new.id, new.title, new.authors, new.description, new.categories, new.isbn);
+    END"""
+
+
+def replace_update_trigger(trigger):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        if 'googlebooks_googlebook_fts' not in schema_editor.connection.introspection.table_names():
+            return
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER IF EXISTS googlebooks_googlebook_fts_au')
+            cursor.execute(trigger)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('googlebooks', '0003_googlevolumecache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='googlebook',
+            name='fetched_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        # Keep fetched_at bumps from rewriting the full-text index
+        migrations.RunPython(
+            replace_update_trigger(RESTRICTED_UPDATE_TRIGGER),
+            replace_update_trigger(UNRESTRICTED_UPDATE_TRIGGER),
+        ),
+    ]
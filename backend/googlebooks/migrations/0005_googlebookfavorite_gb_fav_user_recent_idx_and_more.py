@@ -0,0 +1,23 @@
+# Generated by Django 4.2.19 on 2026-10-18 13:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('googlebooks', '0004_googlebook_fetched_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='googlebookfavorite',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='gb_fav_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='googlebookreadinghistory',
+            index=models.Index(fields=['user', '-last_read', '-id'], name='gb_hist_user_recent_idx'),
+        ),
+    ]
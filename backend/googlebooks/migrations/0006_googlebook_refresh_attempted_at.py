@@ -0,0 +1,18 @@
+# Generated by Django 4.2.19 on 2026-10-18 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('googlebooks', '0005_googlebookfavorite_gb_fav_user_recent_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='googlebook',
+            name='refresh_attempted_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -13,6 +13,8 @@ class GoogleBook(models.Model):
     page_count = models.IntegerField(null=True, blank=True)
     categories = models.TextField(blank=True)
     language = models.CharField(max_length=10, blank=True)
+    fetched_at = models.DateTimeField(null=True, blank=True, db_index=True)  # Last write from upstream data
+    refresh_attempted_at = models.DateTimeField(null=True, blank=True, db_index=True)  # Last refresh, failed or not
     favorited_by = models.ManyToManyField(settings.AUTH_USER_MODEL, through='GoogleBookFavorite', related_name='favorite_google_books')
 
     def __str__(self):
@@ -25,6 +27,10 @@ class GoogleBookFavorite(models.Model):
 
     class Meta:
         unique_together = ('user', 'book')
+        indexes = [
+            # A user's favorites, newest first (CreatedAtCursorPagination)
+            models.Index(fields=['user', '-created_at', '-id'], name='gb_fav_user_recent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.book.title}"
@@ -38,6 +44,20 @@ class GoogleBookReadingHistory(models.Model):
     class Meta:
         unique_together = ('user', 'book')
         ordering = ['-last_read']
+        indexes = [
+            # A user's history, most recently read first (LastReadCursorPagination)
+            models.Index(fields=['user', '-last_read', '-id'], name='gb_hist_user_recent_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.user.username}'s progress on {self.book.title}: {self.progress}%"
\ No newline at end of file
+        return f"{self.user.username}'s progress on {self.book.title}: {self.progress}%"
+
+class GoogleVolumeCache(models.Model):
+    """Raw upstream volume JSON, kept for stale-while-revalidate serving."""
+    google_books_id = models.CharField(max_length=100, unique=True)
+    payload = models.JSONField()
+    etag = models.CharField(max_length=255, blank=True)
+    fetched_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.google_books_id} fetched {self.fetched_at:%Y-%m-%d %H:%M}"
@@ -0,0 +1,93 @@
+"""Google Books volume -> catalog row mapping, shared by every ingest path.
+
+``normalize_volumes`` turns a whole ``items`` array into column lists in a
+single pass; ``to_records`` re-keys those columns onto a model's fields
+(GoogleBook by default, Book via ``BOOK_FIELDS``).
+"""
+import datetime
+import re
+
+COLUMNS = (
+    'google_books_id', 'title', 'authors', 'description', 'thumbnail_url', 'preview_link',
+    'publication_date', 'isbn', 'page_count', 'categories', 'language',
+)
+
+# Column -> model field maps
+GOOGLE_BOOK_FIELDS = {column: column for column in COLUMNS}
+BOOK_FIELDS = {
+    'google_books_id': 'google_books_id',
+    'title': 'title',
+    'authors': 'authors',
+    'description': 'description',
+    'thumbnail_url': 'thumbnail_url',
+    'preview_link': 'preview_link',
+    'publication_date': 'publication_date',
+    'isbn': 'isbn',
+    'page_count': 'number_of_pages',
+    'categories': 'subjects',
+}
+
+# publishedDate comes as "2004", "2004-03" or "2004-03-15" (sometimes with a time part)
+DATE_PATTERN = re.compile(r'^(\d{4})(?:-(\d{2}))?(?:-(\d{2}))?')
+DEFAULT_AUTHORS = ['Unknown Author']
+
+
+def parse_published_date(value):
+    match = DATE_PATTERN.match(value) if value else None
+    if not match:
+        return None
+    year, month, day = match.groups()
+    try:
+        return datetime.date(int(year), int(month or 1), int(day or 1))
+    except ValueError:
+        return None
+
+
+def pick_isbn(identifiers):
+    """ISBN-13 when present, otherwise ISBN-10, otherwise ''."""
+    isbn_10 = ''
+    for identifier in identifiers or ():
+        kind = identifier.get('type')
+        if kind == 'ISBN_13':
+            return identifier.get('identifier', '')
+        if kind == 'ISBN_10' and not isbn_10:
+            isbn_10 = identifier.get('identifier', '')
+    return isbn_10
+
+
+def secure_url(url):
+    if url and url.startswith('http://'):
+        return 'https://' + url[7:]
+    return url or None
+
+
+def normalize_volumes(items):
+    """Map an ``items`` array onto column lists; items without id or volumeInfo are skipped."""
+    columns = {column: [] for column in COLUMNS}
+    ids, titles, authors, descriptions, thumbnails, previews, dates, isbns, pages, categories, languages = (
+        columns[column].append for column in COLUMNS
+    )
+    for item in items:
+        volume_id = item.get('id')
+        info = item.get('volumeInfo')
+        if not volume_id or not info:
+            continue
+        ids(volume_id)
+        titles((info.get('title') or '').strip())
+        authors(', '.join(info.get('authors') or DEFAULT_AUTHORS))
+        descriptions(info.get('description', ''))
+        thumbnails(secure_url((info.get('imageLinks') or {}).get('thumbnail')))
+        previews(info.get('previewLink'))
+        dates(parse_published_date(info.get('publishedDate')))
+        isbns(pick_isbn(info.get('industryIdentifiers')))
+        pages(info.get('pageCount'))
+        categories(', '.join(info.get('categories') or ()))
+        languages(info.get('language', ''))
+    return columns
+
+
+def to_records(columns, field_map=GOOGLE_BOOK_FIELDS):
+    """Row dicts keyed by model field name, in item order."""
+    names = [column for column in COLUMNS if column in field_map]
+    fields = [field_map[column] for column in names]
+    return [dict(zip(fields, row)) for row in zip(*(columns[column] for column in names))]
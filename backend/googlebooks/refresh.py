@@ -0,0 +1,169 @@
+import logging
+import queue
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Min, Q
+from django.utils import timezone
+
+from .guard import UpstreamUnavailable
+from .ingest import ingest_volumes
+from .models import GoogleBook, GoogleVolumeCache
+from .volume_cache import get_volume_cache
+
+logger = logging.getLogger(__name__)
+
+# Defaults for settings.GOOGLE_BOOKS_CATALOG_REFRESH
+DEFAULT_CATALOG_REFRESH = {
+    'TTL': 60 * 60 * 24 * 7,  # Rows older than this are refreshed
+    'RETRY_AFTER': 60 * 60 * 24,  # Rows whose refresh failed wait this long before the next attempt
+    'BATCH_SIZE': 200,
+    'WORKERS': 4,
+    'INLINE_UPDATES': False,  # Let search rewrite existing rows in the request
+}
+
+
+def get_refresh_config():
+    return {**DEFAULT_CATALOG_REFRESH, **getattr(settings, 'GOOGLE_BOOKS_CATALOG_REFRESH', {})}
+
+
+class CatalogRefresher:
+    """Refreshes GoogleBook rows whose ``fetched_at`` is older than the TTL.
+
+    A producer loads a batch of the stalest rows into a local queue; worker
+    threads drain it through the volume cache. Rows whose cached payload is
+    still fresh are re-ingested without an upstream call, the rest are
+    revalidated with If-None-Match so unchanged volumes cost a 304 only.
+
+    Every attempt stamps ``refresh_attempted_at``; rows that fail (a 404,
+    a bad payload) sit out ``retry_after`` so they don't hold the head of
+    the queue and starve the rows behind them.
+    """
+
+    def __init__(self, ttl, batch_size, workers, retry_after=DEFAULT_CATALOG_REFRESH['RETRY_AFTER']):
+        self.ttl = timedelta(seconds=ttl)
+        self.retry_after = timedelta(seconds=retry_after)
+        self.batch_size = batch_size
+        self.workers = workers
+        self.queue = queue.Queue()
+        self.metrics = {
+            'queue_depth': 0,
+            'refresh_lag_seconds': 0.0,
+            'never_fetched': 0,
+            'refreshed': 0,
+            'not_modified': 0,
+            'failed': 0,
+            'deferred': 0,
+            'upstream_calls': 0,
+            'upstream_calls_saved': 0,
+        }
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        config = get_refresh_config()
+        return cls(config['TTL'], config['BATCH_SIZE'], config['WORKERS'], config['RETRY_AFTER'])
+
+    def stale_rows(self):
+        now = timezone.now()
+        return (
+            GoogleBook.objects.filter(Q(fetched_at__lt=now - self.ttl) | Q(fetched_at=None))
+            .filter(Q(refresh_attempted_at__lt=now - self.retry_after) | Q(refresh_attempted_at=None))
+            .order_by(F('fetched_at').asc(nulls_first=True))
+            .values_list('google_books_id', flat=True)[:self.batch_size]
+        )
+
+    def refresh_lag(self):
+        """Seconds the stalest fetched row is past its TTL (0 when nothing is due)."""
+        oldest = GoogleBook.objects.aggregate(oldest=Min('fetched_at'))['oldest']
+        if oldest is None:
+            return 0.0
+        return max(0.0, (timezone.now() - oldest - self.ttl).total_seconds())
+
+    def run_once(self):
+        """Refresh one batch; returns counts of rows queued, refreshed, failed and deferred.
+
+        Deferred rows (rate limited, breaker open) are left unstamped and come
+        back in the next batch; failed rows wait out ``retry_after``.
+        """
+        for volume_id in self.stale_rows():
+            self.queue.put(volume_id)
+        self._record(
+            queue_depth=self.queue.qsize(),
+            never_fetched=GoogleBook.objects.filter(fetched_at=None).count(),
+        )
+        batch = self.queue.qsize()
+        if not batch:
+            self._record(refresh_lag_seconds=self.refresh_lag())
+            return {'queued': 0, 'refreshed': 0, 'failed': 0, 'deferred': 0}
+
+        done, failed = [], []
+        threads = [
+            threading.Thread(target=self._work, args=(done, failed)) for _ in range(min(self.workers, batch))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Rows that came back unchanged still count as fresh now
+        now = timezone.now()
+        GoogleBook.objects.filter(google_books_id__in=done).update(fetched_at=now, refresh_attempted_at=now)
+        GoogleBook.objects.filter(google_books_id__in=failed).update(refresh_attempted_at=now)
+        self._record(queue_depth=self.queue.qsize(), refresh_lag_seconds=self.refresh_lag())
+        return {
+            'queued': batch,
+            'refreshed': len(done),
+            'failed': len(failed),
+            'deferred': batch - len(done) - len(failed),
+        }
+
+    def _work(self, done, failed):
+        volume_cache = get_volume_cache()
+        try:
+            while True:
+                try:
+                    volume_id = self.queue.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    if self._refresh_from_cache(volume_cache, volume_id):
+                        self._count('upstream_calls_saved')
+                    else:
+                        entry = GoogleVolumeCache.objects.filter(google_books_id=volume_id).values('etag').first()
+                        self._count('upstream_calls')
+                        if volume_cache.revalidate(volume_id, entry['etag'] if entry else ''):
+                            self._count('not_modified')
+                    self._count('refreshed')
+                    with self._lock:
+                        done.append(volume_id)
+                except UpstreamUnavailable:
+                    # Rate limited or breaker open: the row stays stale for the next run
+                    self._count('deferred')
+                except Exception as err:
+                    self._count('failed')
+                    with self._lock:
+                        failed.append(volume_id)
+                    logger.warning(f'Refreshing volume {volume_id} failed: {err}')
+                finally:
+                    self.queue.task_done()
+        finally:
+            close_old_connections()
+
+    def _refresh_from_cache(self, volume_cache, volume_id):
+        entry = GoogleVolumeCache.objects.filter(google_books_id=volume_id).first()
+        if entry is None or timezone.now() - entry.fetched_at > volume_cache.fresh_ttl:
+            return False
+        if entry.payload.get('volumeInfo'):
+            ingest_volumes([{**entry.payload, 'id': volume_id}])
+        return True
+
+    def _count(self, name):
+        with self._lock:
+            self.metrics[name] += 1
+
+    def _record(self, **values):
+        with self._lock:
+            self.metrics.update(values)
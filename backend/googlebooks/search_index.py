@@ -0,0 +1,77 @@
+from django.db import connection
+from django.db.models import Q
+
+from .models import GoogleBook
+
+FTS_TABLE = 'googlebooks_googlebook_fts'
+INDEXED_COLUMNS = ('title', 'authors', 'description', 'categories', 'isbn')
+# The FTS5 table, its triggers and the GIN index are created by migrations
+# 0002_googlebook_search_index and 0004_googlebook_fetched_at.
+
+# PostgreSQL: queries must use the GIN index's expression.
+PG_DOCUMENT = "to_tsvector('simple', " + " || ' ' || ".join(f"coalesce({column}, '')" for column in INDEXED_COLUMNS) + ")"
+
+
+def parse_query(search_query):
+    """Split a volumes query into subject terms and free-text terms.
+
+    ``subject:science+fiction`` yields the subject terms ``science`` and
+    ``fiction``, matching how the frontend builds category queries.
+    """
+    subjects, terms = [], []
+    for token in (search_query or '').lower().split():
+        if token.startswith('subject:'):
+            subjects.extend(part for part in token[len('subject:'):].split('+') if part)
+        else:
+            terms.append(token)
+    return subjects, terms
+
+
+def _fts_quote(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+_fts_table_exists = None
+
+
+def _has_fts_table():
+    global _fts_table_exists
+    if _fts_table_exists is None:
+        _fts_table_exists = FTS_TABLE in connection.introspection.table_names()
+    return _fts_table_exists
+
+
+def _search_ids(subjects, terms, limit):
+    if connection.vendor == 'sqlite' and _has_fts_table():
+        clauses = [_fts_quote(term) for term in terms]
+        if subjects:
+            clauses.insert(0, f"categories : ({' AND '.join(_fts_quote(term) for term in subjects)})")
+        match = ' AND '.join(clauses)
+        sql = f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s'
+        params = [match, limit]
+    elif connection.vendor == 'postgresql':
+        sql = (f"SELECT id FROM googlebooks_googlebook WHERE {PG_DOCUMENT} @@ plainto_tsquery('simple', %s) "
+               f"ORDER BY ts_rank({PG_DOCUMENT}, plainto_tsquery('simple', %s)) DESC LIMIT %s")
+        text = ' '.join(subjects + terms)
+        params = [text, text, limit]
+    else:
+        queryset = GoogleBook.objects.all()
+        for subject in subjects:
+            queryset = queryset.filter(categories__icontains=subject)
+        for term in terms:
+            queryset = queryset.filter(Q(title__icontains=term) | Q(authors__icontains=term))
+        return list(queryset.values_list('id', flat=True)[:limit])
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_local(search_query, limit=40):
+    """Search the ingested catalog; returns GoogleBook rows best match first."""
+    subjects, terms = parse_query(search_query)
+    if not subjects and not terms:
+        return []
+    ids = _search_ids(subjects, terms, limit)
+    books = GoogleBook.objects.in_bulk(ids)
+    return [books[book_id] for book_id in ids if book_id in books]
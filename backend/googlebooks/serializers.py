@@ -1,9 +1,13 @@
 from rest_framework import serializers
+from bookflix.serializers import LibraryStateListSerializer, LibraryStateMixin, NestedLibraryStateMixin
 from .models import GoogleBook, GoogleBookFavorite, GoogleBookReadingHistory
 
-class GoogleBookSerializer(serializers.ModelSerializer):
+class GoogleBookSerializer(LibraryStateMixin, serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     reading_progress = serializers.SerializerMethodField()
+    favorite_model = GoogleBookFavorite
+    history_model = GoogleBookReadingHistory
+    library_catalog = 'googlebooks'
 
     class Meta:
         model = GoogleBook
@@ -11,31 +15,20 @@ class GoogleBookSerializer(serializers.ModelSerializer):
                 'thumbnail_url', 'preview_link', 'publication_date',
                 'isbn', 'page_count', 'categories', 'language',
                 'is_favorited', 'reading_progress']
+        list_serializer_class = LibraryStateListSerializer
 
-    def get_is_favorited(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return GoogleBookFavorite.objects.filter(user=request.user, book=obj).exists()
-        return False
-
-    def get_reading_progress(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            history = GoogleBookReadingHistory.objects.filter(user=request.user, book=obj).first()
-            if history:
-                return history.progress
-        return 0
-
-class GoogleBookFavoriteSerializer(serializers.ModelSerializer):
+class GoogleBookFavoriteSerializer(NestedLibraryStateMixin, serializers.ModelSerializer):
     book = GoogleBookSerializer(read_only=True)
 
     class Meta:
         model = GoogleBookFavorite
         fields = ['id', 'book', 'created_at']
+        list_serializer_class = LibraryStateListSerializer
 
-class GoogleBookReadingHistorySerializer(serializers.ModelSerializer):
+class GoogleBookReadingHistorySerializer(NestedLibraryStateMixin, serializers.ModelSerializer):
     book = GoogleBookSerializer(read_only=True)
 
     class Meta:
         model = GoogleBookReadingHistory
-        fields = ['id', 'book', 'last_read', 'progress']
\ No newline at end of file
+        fields = ['id', 'book', 'last_read', 'progress']
+        list_serializer_class = LibraryStateListSerializer
\ No newline at end of file
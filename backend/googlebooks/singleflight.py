@@ -0,0 +1,151 @@
+import asyncio
+import hashlib
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Defaults for settings.GOOGLE_BOOKS_SINGLE_FLIGHT
+DEFAULT_SINGLE_FLIGHT = {
+    'CACHE_ALIAS': None,  # Set to a shared cache alias to coalesce across processes too
+    'LOCK_TIMEOUT': 15,  # Upper bound on how long followers wait for a leader
+    'RESULT_TTL': 10,
+    'POLL_INTERVAL': 0.05,
+}
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers share its outcome.
+
+    Within a process, followers block on the leader's call. With a shared
+    cache alias, the leader also takes a cache lock and publishes its result
+    so leaders in other processes can pick it up instead of refetching.
+    """
+
+    def __init__(self, cache_alias=None, lock_timeout=15, result_ttl=10, poll_interval=0.05):
+        self.cache_alias = cache_alias
+        self.lock_timeout = lock_timeout
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    @classmethod
+    def from_settings(cls):
+        config = {**DEFAULT_SINGLE_FLIGHT, **getattr(settings, 'GOOGLE_BOOKS_SINGLE_FLIGHT', {})}
+        return cls(config['CACHE_ALIAS'], config['LOCK_TIMEOUT'], config['RESULT_TTL'], config['POLL_INTERVAL'])
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run_shared(key, fn) if self.cache_alias else fn()
+        except BaseException as err:
+            call.error = err
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+    def _run_shared(self, key, fn):
+        cache = caches[self.cache_alias]
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        lock_key, result_key = f'singleflight:lock:{digest}', f'singleflight:value:{digest}'
+
+        if not cache.add(lock_key, uuid.uuid4().hex, self.lock_timeout):
+            # Another process is fetching; wait for its result while it holds the lock
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+                published = cache.get(result_key)
+                if published is not None:
+                    with self._lock:
+                        self.coalesced += 1
+                    return published[0]
+                if cache.get(lock_key) is None:
+                    break
+            return fn()
+
+        try:
+            result = fn()
+            # Wrapped so a None result (not found) is published too
+            cache.set(result_key, (result,), self.result_ttl)
+            return result
+        finally:
+            cache.delete(lock_key)
+
+
+class AsyncSingleFlight:
+    """In-process single-flight for coroutines, one future per key and event loop."""
+
+    def __init__(self):
+        self._calls = {}
+        self.coalesced = 0
+
+    async def do(self, key, coroutine_fn):
+        loop = asyncio.get_running_loop()
+        call_key = (id(loop), key)
+        while (future := self._calls.get(call_key)) is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise  # This caller was cancelled
+                # The leader was cancelled before finishing; retry, possibly as the new leader
+
+        future = self._calls[call_key] = loop.create_future()
+        try:
+            result = await coroutine_fn()
+        except Exception as err:
+            future.set_exception(err)
+            # Mark the exception retrieved when nobody else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if not future.done():
+                # Leader cancelled (client disconnect, timeout): release the followers
+                future.cancel()
+            del self._calls[call_key]
+
+
+_single_flight = None
+_async_single_flight = AsyncSingleFlight()
+
+
+def get_single_flight():
+    global _single_flight
+    if _single_flight is None:
+        _single_flight = SingleFlight.from_settings()
+    return _single_flight
+
+
+def get_async_single_flight():
+    return _async_single_flight
@@ -0,0 +1,355 @@
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+import httpx
+import requests
+from asgiref.sync import async_to_sync
+from django.core.cache.backends.locmem import LocMemCache
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from books.progress import ProgressBuffer
+
+from .async_client import AsyncGoogleBooksClient
+from .client import GoogleBooksClient, StubTransport
+from .guard import CircuitBreaker, CircuitOpen, RateLimited, TokenBucket, UpstreamGuard
+from .ingest import ingest_volumes
+from .models import GoogleBook, GoogleBookFavorite, GoogleBookReadingHistory
+from .refresh import CatalogRefresher
+
+
+def make_volume(index, title=None, volume_id=None):
+    return {
+        'id': volume_id or f'vol-{index}',
+        'volumeInfo': {
+            'title': title or f'Book {index}',
+            'authors': ['Test Author'],
+            'description': 'A test volume',
+            'publishedDate': '2004-03-15',
+            'industryIdentifiers': [{'type': 'ISBN_13', 'identifier': f'978{index:010d}'}],
+            'pageCount': 100 + index,
+            'language': 'en',
+        },
+    }
+
+
+class IngestQueryCountTests(TestCase):
+    """ingest_volumes costs the same number of queries whatever the page size.
+
+    Counts include the SAVEPOINT / RELEASE pair of the transaction.atomic()
+    block, which TestCase turns into a savepoint.
+    """
+
+    def test_new_volumes(self):
+        for count in (1, 25):
+            GoogleBook.objects.all().delete()
+            volumes = [make_volume(i) for i in range(count)]
+            # SELECT existing rows, one bulk INSERT
+            with self.assertNumQueries(4):
+                books = ingest_volumes(volumes)
+            self.assertEqual([book.google_books_id for book in books], [f'vol-{i}' for i in range(count)])
+            self.assertTrue(all(book.pk for book in books))
+
+    def test_existing_volumes_changed(self):
+        for count in (1, 25):
+            ingest_volumes([make_volume(i) for i in range(count)])
+            volumes = [make_volume(i, title=f'Retitled {count} {i}') for i in range(count)]
+            # SELECT existing rows, one bulk UPDATE
+            with self.assertNumQueries(4):
+                ingest_volumes(volumes)
+            self.assertEqual(GoogleBook.objects.get(google_books_id='vol-0').title, f'Retitled {count} 0')
+
+    def test_existing_volumes_unchanged(self):
+        volumes = [make_volume(i) for i in range(25)]
+        ingest_volumes(volumes)
+        # SELECT only; nothing differs, so nothing is written
+        with self.assertNumQueries(3):
+            ingest_volumes(volumes)
+
+    def test_mixed_page(self):
+        ingest_volumes([make_volume(i) for i in range(10)])
+        volumes = [make_volume(i, title=f'New title {i}') for i in range(25)]
+        # SELECT, bulk INSERT for the 15 new rows, bulk UPDATE for the 10 changed ones
+        with self.assertNumQueries(5):
+            ingest_volumes(volumes)
+        self.assertEqual(GoogleBook.objects.count(), 25)
+
+
+class IngestCleaningTests(TestCase):
+    def test_over_long_values_are_truncated(self):
+        volume = make_volume(1, title='T' * 400)
+        volume['volumeInfo']['authors'] = [f'Author {i}' for i in range(100)]
+        volume['volumeInfo']['language'] = 'en-GB-x-very-long-tag'
+        volume['volumeInfo']['imageLinks'] = {'thumbnail': 'http://books.example.com/' + 'a' * 300}
+        book = ingest_volumes([volume, make_volume(2)])[0]
+        book.refresh_from_db()
+        self.assertEqual(book.title, 'T' * 255)
+        self.assertEqual(len(book.authors), 255)
+        self.assertEqual(len(book.language), 10)
+        self.assertIsNone(book.thumbnail_url)
+        self.assertEqual(GoogleBook.objects.count(), 2)
+
+
+@override_settings(GOOGLE_BOOKS_API_KEY='test-key', GOOGLE_BOOKS_LOCAL_SEARCH={'ENABLED': False})
+class LibraryStateQueryCountTests(TestCase):
+    """is_favorited / reading_progress cost the same queries for 1 book as for 20."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='reader', email='reader@example.com',
+                                                         password='secret-password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, query, count):
+        client = mock.Mock()
+        client.search.return_value = {'items': [make_volume(i, volume_id=f'{query}-{i}') for i in range(count)]}
+        with mock.patch('googlebooks.views.get_client', return_value=client):
+            response = self.client.get('/api/googlebooks/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), count)
+        return response
+
+    def test_search_query_count_is_constant(self):
+        with CaptureQueriesContext(connection) as single:
+            self.search('single', 1)
+        with self.assertNumQueries(len(single)):
+            response = self.search('page', 20)
+        self.assertFalse(any(book['is_favorited'] for book in response.data))
+
+    def add_library(self, prefix, count):
+        books = ingest_volumes([make_volume(i, volume_id=f'{prefix}-{i}') for i in range(count)])
+        GoogleBookFavorite.objects.bulk_create([GoogleBookFavorite(user=self.user, book=book) for book in books])
+        GoogleBookReadingHistory.objects.bulk_create(
+            [GoogleBookReadingHistory(user=self.user, book=book, progress=50) for book in books]
+        )
+
+    def test_favorites_list_query_count_is_constant(self):
+        self.add_library('one', 1)
+        with CaptureQueriesContext(connection) as single:
+            response = self.client.get('/api/googlebooks/favorites/')
+        self.assertEqual(len(response.data['results']), 1)
+
+        self.add_library('many', 19)
+        with self.assertNumQueries(len(single)):
+            response = self.client.get('/api/googlebooks/favorites/')
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertTrue(all(item['book']['is_favorited'] for item in response.data['results']))
+        self.assertTrue(all(item['book']['reading_progress'] == 50 for item in response.data['results']))
+
+
+class LibrarySummaryOverlayTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='reader', email='reader@example.com',
+                                                         password='secret-password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.books = ingest_volumes([make_volume(i) for i in range(3)])
+        GoogleBookReadingHistory.objects.create(user=self.user, book=self.books[0], progress=30)
+        self.buffer = ProgressBuffer(flush_interval=60, max_pending=1000)
+        for patcher in (mock.patch.object(self.buffer, '_start'),
+                        mock.patch('books.progress.get_progress_buffer', return_value=self.buffer)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def library(self):
+        response = self.client.get('/api/googlebooks/library/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_summary_includes_unflushed_progress(self):
+        self.assertEqual(self.library()['in_progress_count'], 1)
+        self.buffer.record('googlebooks', self.user.pk, self.books[0].pk, 100)
+        self.buffer.record('googlebooks', self.user.pk, self.books[1].pk, 40)
+
+        library = self.library()
+        self.assertEqual((library['in_progress_count'], library['finished_count']), (1, 1))
+        self.assertEqual([(entry['book_id'], entry['progress']) for entry in library['recent']],
+                         [(self.books[1].pk, 40), (self.books[0].pk, 100)])
+
+        # Once flushed the stored summary says the same
+        self.buffer.flush()
+        flushed = self.library()
+        for key in ('recent', 'in_progress_count', 'finished_count'):
+            self.assertEqual(flushed[key], library[key])
+
+@override_settings(GOOGLE_BOOKS_API_KEY='test-key')
+class RetrieveRevalidationTests(TestCase):
+    def setUp(self):
+        self.book = ingest_volumes([make_volume(1)])[0]
+        schedule = mock.patch('googlebooks.volume_cache.VolumeCache.schedule_revalidation')
+        self.schedule = schedule.start()
+        self.addCleanup(schedule.stop)
+
+    def retrieve(self):
+        response = APIClient().get(f'/api/googlebooks/{self.book.google_books_id}/')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_fresh_row_is_not_revalidated(self):
+        # Search-ingested rows have no volume cache entry; that alone doesn't make them stale
+        with self.assertNumQueries(1):
+            self.retrieve()
+        self.schedule.assert_not_called()
+
+    def test_stale_row_is_revalidated_in_the_background(self):
+        GoogleBook.objects.filter(pk=self.book.pk).update(fetched_at=timezone.now() - timedelta(days=2))
+        self.retrieve()
+        self.schedule.assert_called_once_with(self.book.google_books_id, '')
+
+    def test_revalidation_errors_do_not_refetch(self):
+        GoogleBook.objects.filter(pk=self.book.pk).update(fetched_at=timezone.now() - timedelta(days=2))
+        self.schedule.side_effect = RuntimeError('executor shut down')
+        with mock.patch('googlebooks.views.GoogleBookViewSet._fetch_volume') as fetch_volume:
+            self.assertEqual(self.retrieve().data['google_books_id'], self.book.google_books_id)
+        fetch_volume.assert_not_called()
+
+    def test_async_retrieve_revalidates_stale_rows(self):
+        GoogleBook.objects.filter(pk=self.book.pk).update(fetched_at=timezone.now() - timedelta(days=2))
+        response = self.client.get(f'/api/googlebooks/async/{self.book.google_books_id}/')
+        self.assertEqual(response.status_code, 200)
+        self.schedule.assert_called_once_with(self.book.google_books_id, '')
+
+class CatalogRefresherTests(TestCase):
+    def test_failed_rows_do_not_starve_the_queue(self):
+        ingest_volumes([make_volume(i) for i in range(3)])
+        week_ago = timezone.now() - timedelta(days=8)
+        GoogleBook.objects.filter(google_books_id='vol-0').update(fetched_at=None)
+        GoogleBook.objects.exclude(google_books_id='vol-0').update(fetched_at=week_ago)
+
+        def revalidate(volume_id, etag):
+            if volume_id == 'vol-0':
+                raise ValueError('404 Not Found')
+            return False
+
+        volume_cache = mock.Mock(revalidate=mock.Mock(side_effect=revalidate))
+        refresher = CatalogRefresher(ttl=60 * 60 * 24 * 7, batch_size=2, workers=1)
+        with mock.patch('googlebooks.refresh.get_volume_cache', return_value=volume_cache):
+            first = refresher.run_once()
+            second = refresher.run_once()
+            third = refresher.run_once()
+
+        self.assertEqual(first, {'queued': 2, 'refreshed': 1, 'failed': 1, 'deferred': 0})
+        self.assertEqual(second, {'queued': 1, 'refreshed': 1, 'failed': 0, 'deferred': 0})
+        self.assertEqual(third['queued'], 0)
+        failed = GoogleBook.objects.get(google_books_id='vol-0')
+        self.assertIsNone(failed.fetched_at)
+        self.assertIsNotNone(failed.refresh_attempted_at)
+
+
+class FakeUpstream:
+    """Scripted Google Books: answers every request with ``status`` until changed."""
+
+    def __init__(self, status=200, headers=None):
+        self.status = status
+        self.headers = headers or {}
+
+    def __call__(self, request):
+        if self.status != 200:
+            return self.status, {'error': {'code': self.status}}, self.headers
+        return 200, {'totalItems': 1, 'items': [make_volume(1)]}
+
+
+class UpstreamGuardTests(SimpleTestCase):
+    def setUp(self):
+        self.now = time.time()
+        clock = mock.patch('time.time', lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.upstream = FakeUpstream()
+        self.transport = StubTransport(self.upstream)
+
+    def make_client(self, bucket=None):
+        cache = LocMemCache(f'guard-test-{uuid.uuid4().hex}', {})
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, cache=cache)
+        guard = UpstreamGuard(bucket or TokenBucket(rate=1000, burst=1000), breaker, max_wait=0)
+        return GoogleBooksClient(api_key='test-key', transport=self.transport, guard=guard), guard
+
+    def test_429_storm_opens_the_breaker(self):
+        client, guard = self.make_client()
+        self.upstream.status = 429
+        for _ in range(3):
+            with self.assertRaises(requests.exceptions.HTTPError):
+                client.search('storm')
+        for _ in range(20):
+            with self.assertRaises(CircuitOpen):
+                client.search('storm')
+        # Only the calls before the breaker opened reached the upstream
+        self.assertEqual(self.transport.calls, 3)
+        self.assertEqual(guard.stats(), {'state': 'open', 'rejected': 20})
+
+    def test_retry_after_opens_the_breaker_at_once(self):
+        client, guard = self.make_client()
+        self.upstream.status, self.upstream.headers = 429, {'Retry-After': '120'}
+        with self.assertRaises(requests.exceptions.HTTPError):
+            client.search('storm')
+        with self.assertRaises(CircuitOpen) as refused:
+            client.search('storm')
+        self.assertEqual(refused.exception.retry_after, 120)
+        self.assertEqual(self.transport.calls, 1)
+
+    def test_breaker_recovers_through_half_open(self):
+        client, guard = self.make_client()
+        self.upstream.status = 503
+        for _ in range(3):
+            with self.assertRaises(requests.exceptions.HTTPError):
+                client.search('outage')
+        self.assertEqual(guard.stats()['state'], 'open')
+
+        # A failed probe opens the breaker again
+        self.now += 31
+        self.assertEqual(guard.stats()['state'], 'half_open')
+        with self.assertRaises(requests.exceptions.HTTPError):
+            client.search('outage')
+        self.assertEqual(guard.stats()['state'], 'open')
+
+        # A successful probe closes it
+        self.now += 31
+        self.upstream.status = 200
+        self.assertEqual(client.search('outage')['totalItems'], 1)
+        self.assertEqual(guard.stats()['state'], 'closed')
+        client.search('outage')
+        self.assertEqual(self.transport.calls, 6)
+
+    def test_half_open_allows_a_single_probe(self):
+        client, guard = self.make_client()
+        guard.breaker.trip()
+        self.now += 31
+        self.assertTrue(guard.breaker.allow())
+        with self.assertRaises(CircuitOpen):
+            client.search('probe')
+        self.assertEqual(self.transport.calls, 0)
+
+    def test_rate_limited_caller_does_not_hold_the_probe(self):
+        bucket = mock.Mock(try_acquire=mock.Mock(side_effect=[5.0, 0]))
+        client, guard = self.make_client(bucket)
+        guard.breaker.trip()
+        self.now += 31
+        with self.assertRaises(RateLimited):
+            client.search('probe')
+        # The next caller with a token gets the probe and closes the breaker
+        client.search('probe')
+        self.assertEqual(guard.stats()['state'], 'closed')
+        self.assertEqual(self.transport.calls, 1)
+
+
+class AsyncClientLifecycleTests(SimpleTestCase):
+    def test_client_is_closed_with_its_event_loop(self):
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, json={'totalItems': 0}))
+        client = AsyncGoogleBooksClient(api_key='test-key', transport=transport)
+        opened = []
+
+        async def search():
+            await client.search('loop')
+            opened.append(client._client)
+
+        # Each async_to_sync call runs on a fresh loop, as async views do under WSGI
+        for _ in range(3):
+            async_to_sync(search)()
+        self.assertEqual(len(set(map(id, opened))), 3)
+        self.assertTrue(all(http_client.is_closed for http_client in opened))
@@ -1,5 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import GoogleBookViewSet
 
 router = DefaultRouter()
@@ -7,5 +8,9 @@ router.register(r'', GoogleBookViewSet)
 
 urlpatterns = [
     path('search/', GoogleBookViewSet.as_view({'get': 'search'}), name='googlebook-search'),
+    # Non-blocking variants for ASGI deployments
+    path('async/search/', async_views.search, name='googlebook-async-search'),
+    path('async/<str:google_books_id>/', async_views.retrieve, name='googlebook-async-detail'),
+    path('async/<str:google_books_id>/download/', async_views.download, name='googlebook-async-download'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,3 +1,4 @@
+import math
 import requests
 import logging
 from rest_framework import viewsets, status, permissions
@@ -5,11 +6,79 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.conf import settings
 from django.shortcuts import get_object_or_404
+from bookflix.pagination import CreatedAtCursorPagination, LastReadCursorPagination
+from books.library import apply_batch, get_summary, update_summary
+from books.progress import get_progress_buffer, overlay_pending
+from books.serializers import LibraryBatchSerializer, LibrarySummarySerializer
+from subscriptions.entitlements import get_entitlements
+from .cache import get_search_cache, normalize_search_query
+from .client import get_client
+from .guard import UpstreamUnavailable
+from .ingest import ingest_volumes
+from .refresh import get_refresh_config
+from .search_index import search_local
+from .singleflight import get_single_flight
+from .volume_cache import get_volume_cache
 from .models import GoogleBook, GoogleBookFavorite, GoogleBookReadingHistory
 from .serializers import GoogleBookSerializer, GoogleBookFavoriteSerializer, GoogleBookReadingHistorySerializer
 
 logger = logging.getLogger(__name__)
 
+VALID_DOWNLOAD_FORMATS = ['pdf', 'epub', 'mobi', 'txt']
+
+def resolve_download(data, format_type):
+    """Pick download links for a volume payload; returns (body, status code)."""
+    # Check if download links are available
+    access_info = data.get('accessInfo', {})
+    download_links = {}
+    
+    # Check for PDF availability
+    if format_type == 'pdf' and access_info.get('pdf', {}).get('isAvailable'):
+        download_links['pdf'] = access_info.get('pdf', {}).get('acsTokenLink')
+    
+    # Check for EPUB availability
+    if format_type == 'epub' and access_info.get('epub', {}).get('isAvailable'):
+        download_links['epub'] = access_info.get('epub', {}).get('acsTokenLink')
+    
+    # If no direct download links are available, use the preview link
+    if not download_links:
+        preview_link = data.get('volumeInfo', {}).get('previewLink')
+        if preview_link:
+            return {
+                'message': f'Direct download not available for this book in {format_type} format.',
+                'preview_link': preview_link
+            }, status.HTTP_200_OK
+        return (
+            {'error': f'This book is not available for download in {format_type} format.'},
+            status.HTTP_404_NOT_FOUND
+        )
+    
+    return download_links, status.HTTP_200_OK
+
+def embed_includes(data, include, user):
+    """Add the extras asked for with ``?include=`` to a book payload.
+
+    ``include=entitlement`` embeds the caller's active subscription (the
+    ``/subscriptions/current/`` payload, or null) so the book page needs one
+    request instead of two.
+    """
+    includes = set(filter(None, (include or '').split(',')))
+    if 'entitlement' in includes:
+        data = {**data, 'entitlement': get_entitlements().for_user(user)}
+    return data
+
+def retry_after_headers(err):
+    """Retry-After header for a request the upstream guard refused."""
+    return {'Retry-After': str(math.ceil(err.retry_after))} if err.retry_after else {}
+
+def upstream_unavailable(err):
+    logger.warning(f'Google Books request refused: {err}')
+    return Response(
+        {'error': 'Google Books API is temporarily unavailable'},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers=retry_after_headers(err)
+    )
+
 class GoogleBookViewSet(viewsets.ModelViewSet):
     queryset = GoogleBook.objects.all()
     serializer_class = GoogleBookSerializer
@@ -22,7 +91,7 @@ class GoogleBookViewSet(viewsets.ModelViewSet):
             # First try to find by google_books_id
             book = get_object_or_404(GoogleBook, google_books_id=google_books_id)
             serializer = self.get_serializer(book, context={'request': request})
-            return Response(serializer.data)
+            response = Response(embed_includes(serializer.data, request.query_params.get('include'), request.user))
         except:
             # If not found in database, try to fetch from Google Books API
             try:
@@ -37,92 +106,19 @@ class GoogleBookViewSet(viewsets.ModelViewSet):
                         status=status.HTTP_503_SERVICE_UNAVAILABLE
                     )
                 
-                # Make request to Google Books API for specific volume
-                response = requests.get(
-                    f'https://www.googleapis.com/books/v1/volumes/{google_books_id}',
-                    params={'key': api_key},
-                    timeout=10
+                # Concurrent requests for the same volume share one upstream fetch
+                book = get_single_flight().do(
+                    f'volume:{google_books_id}',
+                    lambda: self._fetch_volume(google_books_id)
                 )
-                
-                # Handle HTTP errors
-                response.raise_for_status()
-                
-                item = response.json()
-                
-                # Skip if no volumeInfo
-                if not item.get('volumeInfo'):
+                if book is None:
                     return Response({'error': 'Book information not available'}, status=status.HTTP_404_NOT_FOUND)
-
-                volume_info = item.get('volumeInfo', {})
-                
-                # Extract publication date if available
-                publication_date = None
-                if volume_info.get('publishedDate'):
-                    try:
-                        from datetime import datetime
-                        date_str = volume_info.get('publishedDate')
-                        # Handle different date formats
-                        if len(date_str) == 4:  # Just year
-                            publication_date = f"{date_str}-01-01"
-                        elif len(date_str) == 7:  # Year and month
-                            publication_date = f"{date_str}-01"
-                        else:
-                            publication_date = date_str
-                    except Exception as date_err:
-                        logger.error(f'Error parsing publication date: {date_err}')
-                        publication_date = None
-                
-                # Extract ISBN if available
-                isbn = ''
-                if volume_info.get('industryIdentifiers'):
-                    for identifier in volume_info.get('industryIdentifiers'):
-                        if identifier.get('type') in ['ISBN_13', 'ISBN_10']:
-                            isbn = identifier.get('identifier', '')
-                            break
-                
-                # Extract thumbnail URL if available
-                thumbnail_url = None
-                if volume_info.get('imageLinks', {}).get('thumbnail'):
-                    thumbnail_url = volume_info.get('imageLinks', {}).get('thumbnail')
-                    # Convert HTTP to HTTPS if needed
-                    if thumbnail_url and thumbnail_url.startswith('http://'):
-                        thumbnail_url = 'https://' + thumbnail_url[7:]
-                
-                # Extract categories
-                categories = ''
-                if volume_info.get('categories'):
-                    categories = ', '.join(volume_info.get('categories'))
-                
-                book_data = {
-                    'google_books_id': google_books_id,
-                    'title': volume_info.get('title', '').strip(),
-                    'authors': ', '.join(volume_info.get('authors', ['Unknown Author'])),
-                    'description': volume_info.get('description', ''),
-                    'thumbnail_url': thumbnail_url,
-                    'preview_link': volume_info.get('previewLink'),
-                    'publication_date': publication_date,
-                    'isbn': isbn,
-                    'page_count': volume_info.get('pageCount'),
-                    'categories': categories,
-                    'language': volume_info.get('language', '')
-                }
-                
-                # Create or update the book in our database
-                book, created = GoogleBook.objects.get_or_create(
-                    google_books_id=book_data['google_books_id'],
-                    defaults=book_data
-                )
-                
-                # Update book data if it already exists
-                if not created:
-                    for key, value in book_data.items():
-                        if value:  # Only update if value is not empty
-                            setattr(book, key, value)
-                    book.save()
                 
                 serializer = self.get_serializer(book, context={'request': request})
-                return Response(serializer.data)
+                return Response(embed_includes(serializer.data, request.query_params.get('include'), request.user))
                 
+            except UpstreamUnavailable as err:
+                return upstream_unavailable(err)
             except requests.exceptions.Timeout:
                 logger.error('Request to Google Books API timed out')
                 return Response(
@@ -146,6 +142,14 @@ class GoogleBookViewSet(viewsets.ModelViewSet):
                 # If all else fails, try the default behavior (lookup by database ID)
                 return Response({'error': 'Book not found'}, status=status.HTTP_404_NOT_FOUND)
 
+        if settings.GOOGLE_BOOKS_API_KEY:
+            # Serve the stored row now; refresh it in the background once stale
+            try:
+                get_volume_cache().revalidate_if_stale(book.google_books_id, book.fetched_at)
+            except Exception as err:
+                logger.warning(f'Scheduling revalidation of volume {google_books_id} failed: {err}')
+        return response
+
     @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
     def search(self, request):
         category = request.query_params.get('category')
@@ -159,6 +163,15 @@ class GoogleBookViewSet(viewsets.ModelViewSet):
         if category:
             search_query = f'subject:{category}' + (f' {query}' if query else '')
 
+        # Answer from the local catalog when it already has enough matches
+        local_search = getattr(settings, 'GOOGLE_BOOKS_LOCAL_SEARCH', {})
+        if local_search.get('ENABLED'):
+            local_books = search_local(search_query, limit=40)
+            if len(local_books) >= local_search.get('MIN_RESULTS', 20):
+                logger.info(f'Serving {len(local_books)} local results for query: {query}')
+                serializer = self.get_serializer(local_books, many=True)
+                return Response(serializer.data)
+
         try:
             logger.info(f'Searching Google Books for query: {query}')
             
@@ -171,110 +184,29 @@ class GoogleBookViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_503_SERVICE_UNAVAILABLE
                 )
             
-            # Make request to Google Books API
-            response = requests.get(
-                f'https://www.googleapis.com/books/v1/volumes',
-                params={
-                    'q': search_query,
-                    'key': api_key,
-                    'maxResults': 40
-                },
-                timeout=10  # Add timeout to prevent hanging
+            # Concurrent requests for the same query share one upstream fetch
+            books_data = get_single_flight().do(
+                f'search:{normalize_search_query(search_query)}',
+                lambda: self._fetch_search_results(search_query)
             )
-            logger.info(f'Final API URL: {response.request.url}')
-            
-            # Handle HTTP errors
-            response.raise_for_status()
             
-            data = response.json()
-            
-            if not data.get('items'):
+            if not books_data:
                 logger.warning(f'No results found for query: {query}')
                 return Response([])
                 
-            logger.info(f'Found {len(data.get("items", []))} results for query: {query}')
-            
-            books_data = []
-            for item in data.get('items', []):
-                try:
-                    # Skip items without an ID or volumeInfo
-                    if not item.get('id') or not item.get('volumeInfo'):
-                        continue
-
-                    volume_info = item.get('volumeInfo', {})
-                    
-                    # Extract publication date if available
-                    publication_date = None
-                    if volume_info.get('publishedDate'):
-                        try:
-                            from datetime import datetime
-                            date_str = volume_info.get('publishedDate')
-                            # Handle different date formats
-                            if len(date_str) == 4:  # Just year
-                                publication_date = f"{date_str}-01-01"
-                            elif len(date_str) == 7:  # Year and month
-                                publication_date = f"{date_str}-01"
-                            else:
-                                publication_date = date_str
-                        except Exception as date_err:
-                            logger.error(f'Error parsing publication date: {date_err}')
-                            publication_date = None
-                    
-                    # Extract ISBN if available
-                    isbn = ''
-                    if volume_info.get('industryIdentifiers'):
-                        for identifier in volume_info.get('industryIdentifiers'):
-                            if identifier.get('type') in ['ISBN_13', 'ISBN_10']:
-                                isbn = identifier.get('identifier', '')
-                                break
-                    
-                    # Extract thumbnail URL if available
-                    thumbnail_url = None
-                    if volume_info.get('imageLinks', {}).get('thumbnail'):
-                        thumbnail_url = volume_info.get('imageLinks', {}).get('thumbnail')
-                        # Convert HTTP to HTTPS if needed
-                        if thumbnail_url and thumbnail_url.startswith('http://'):
-                            thumbnail_url = 'https://' + thumbnail_url[7:]
-                    
-                    # Extract categories
-                    categories = ''
-                    if volume_info.get('categories'):
-                        categories = ', '.join(volume_info.get('categories'))
-                    
-                    book_data = {
-                        'google_books_id': item.get('id'),
-                        'title': volume_info.get('title', '').strip(),
-                        'authors': ', '.join(volume_info.get('authors', ['Unknown Author'])),
-                        'description': volume_info.get('description', ''),
-                        'thumbnail_url': thumbnail_url,
-                        'preview_link': volume_info.get('previewLink'),
-                        'publication_date': publication_date,
-                        'isbn': isbn,
-                        'page_count': volume_info.get('pageCount'),
-                        'categories': categories,
-                        'language': volume_info.get('language', '')
-                    }
-                    
-                    book, created = GoogleBook.objects.get_or_create(
-                        google_books_id=book_data['google_books_id'],
-                        defaults=book_data
-                    )
-                    
-                    # Update book data if it already exists
-                    if not created:
-                        for key, value in book_data.items():
-                            if value:  # Only update if value is not empty
-                                setattr(book, key, value)
-                        book.save()
-                        
-                    books_data.append(book)
-                except Exception as book_err:
-                    logger.error(f'Error processing book data: {book_err}')
-                    continue
+            logger.info(f'Found {len(books_data)} results for query: {query}')
 
             serializer = self.get_serializer(books_data, many=True)
             return Response(serializer.data)
             
+        except UpstreamUnavailable as err:
+            # Google is throttling us or down: answer from the local catalog instead
+            local_books = search_local(search_query, limit=40)
+            if not local_books:
+                return upstream_unavailable(err)
+            logger.warning(f'Google Books unavailable, serving {len(local_books)} local results for query: {query}')
+            serializer = self.get_serializer(local_books, many=True)
+            return Response(serializer.data)
         except requests.exceptions.Timeout:
             logger.error('Request to Google Books API timed out')
             return Response(
@@ -300,17 +232,42 @@ class GoogleBookViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    def _fetch_search_results(self, search_query):
+        # Serve repeated queries from the search cache
+        search_cache = get_search_cache()
+        data = search_cache.get(search_query)
+        if data is None:
+            # Make request to Google Books API
+            data = get_client().search(search_query, max_results=40)
+            search_cache.set(search_query, data)
+        
+        # Map the volumes and create missing rows in one transaction; existing rows
+        # are refreshed by the refresh_catalog worker unless INLINE_UPDATES is set
+        return ingest_volumes(data.get('items', []), update_existing=get_refresh_config()['INLINE_UPDATES'])
+
+    def _fetch_volume(self, google_books_id):
+        # Make request to Google Books API for specific volume, keeping the raw JSON
+        item = get_volume_cache().fetch(google_books_id)
+        
+        # Skip if no volumeInfo
+        if not item.get('volumeInfo'):
+            return None
+        
+        # Create or update the book in our database
+        item.setdefault('id', google_books_id)
+        books = ingest_volumes([item])
+        return books[0] if books else None
+
     @action(detail=True, methods=['get'])
-    def download(self, request, pk=None):
+    def download(self, request, google_books_id=None):
         try:
             book = self.get_object()
             format_type = request.query_params.get('format', 'pdf')
             
             # Validate format type
-            valid_formats = ['pdf', 'epub', 'mobi', 'txt']
-            if format_type not in valid_formats:
+            if format_type not in VALID_DOWNLOAD_FORMATS:
                 return Response(
-                    {'error': f'Invalid format. Supported formats: {", ".join(valid_formats)}'},
+                    {'error': f'Invalid format. Supported formats: {", ".join(VALID_DOWNLOAD_FORMATS)}'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
@@ -323,45 +280,14 @@ class GoogleBookViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_503_SERVICE_UNAVAILABLE
                 )
             
-            # Check if the book is available for download
-            response = requests.get(
-                f'https://www.googleapis.com/books/v1/volumes/{book.google_books_id}',
-                params={'key': api_key},
-                timeout=10
-            )
-            
-            # Handle HTTP errors
-            response.raise_for_status()
-            data = response.json()
+            # Check if the book is available for download, from the volume cache when possible
+            data = get_volume_cache().get_or_fetch(book.google_books_id)
             
-            # Check if download links are available
-            access_info = data.get('accessInfo', {})
-            download_links = {}
-            
-            # Check for PDF availability
-            if format_type == 'pdf' and access_info.get('pdf', {}).get('isAvailable'):
-                download_links['pdf'] = access_info.get('pdf', {}).get('acsTokenLink')
-            
-            # Check for EPUB availability
-            if format_type == 'epub' and access_info.get('epub', {}).get('isAvailable'):
-                download_links['epub'] = access_info.get('epub', {}).get('acsTokenLink')
-            
-            # If no direct download links are available, use the preview link
-            if not download_links:
-                preview_link = data.get('volumeInfo', {}).get('previewLink')
-                if preview_link:
-                    return Response({
-                        'message': f'Direct download not available for this book in {format_type} format.',
-                        'preview_link': preview_link
-                    })
-                else:
-                    return Response(
-                        {'error': f'This book is not available for download in {format_type} format.'},
-                        status=status.HTTP_404_NOT_FOUND
-                    )
-            
-            return Response(download_links)
+            payload, status_code = resolve_download(data, format_type)
+            return Response(payload, status=status_code)
             
+        except UpstreamUnavailable as err:
+            return upstream_unavailable(err)
         except requests.exceptions.Timeout:
             logger.error('Request to Google Books API timed out')
             return Response(
@@ -382,41 +308,73 @@ class GoogleBookViewSet(viewsets.ModelViewSet):
             )
     
     @action(detail=True, methods=['post'])
-    def favorite(self, request, pk=None):
+    def favorite(self, request, google_books_id=None):
         book = self.get_object()
         favorite, created = GoogleBookFavorite.objects.get_or_create(
             user=request.user,
             book=book
         )
+        if created:
+            update_summary(request.user, 'googlebooks', favorited=[book])
         return Response({'status': 'favorited' if created else 'already favorited'})
 
     @action(detail=True, methods=['post'])
-    def unfavorite(self, request, pk=None):
+    def unfavorite(self, request, google_books_id=None):
         book = self.get_object()
-        GoogleBookFavorite.objects.filter(user=request.user, book=book).delete()
+        deleted, _ = GoogleBookFavorite.objects.filter(user=request.user, book=book).delete()
+        if deleted:
+            update_summary(request.user, 'googlebooks', unfavorited=[book])
         return Response({'status': 'unfavorited'})
 
     @action(detail=True, methods=['post'])
-    def update_progress(self, request, pk=None):
+    def update_progress(self, request, google_books_id=None):
         book = self.get_object()
-        progress = request.data.get('progress', 0)
-        history, _ = GoogleBookReadingHistory.objects.get_or_create(
+        try:
+            progress = int(request.data.get('progress', 0))
+        except (TypeError, ValueError):
+            return Response({'error': 'progress must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        progress_buffer = get_progress_buffer()
+        if progress_buffer is not None:
+            # Heartbeats are coalesced and written in batches by the buffer
+            progress_buffer.record('googlebooks', request.user.pk, book.pk, progress)
+            return Response({'status': 'progress updated'})
+        history, created = GoogleBookReadingHistory.objects.get_or_create(
             user=request.user,
             book=book,
             defaults={'progress': progress}
         )
+        previous = None if created else history.progress
         history.progress = progress
         history.save()
+        update_summary(request.user, 'googlebooks', progress=[(book, progress, previous, history.last_read)])
         return Response({'status': 'progress updated'})
 
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def library(self, request):
+        # Favorite ids, recent reads and counts from one precomputed row, plus unflushed progress
+        summary = overlay_pending(get_summary(request.user, 'googlebooks'), 'googlebooks')
+        return Response(LibrarySummarySerializer(summary).data)
+
+    @action(detail=False, methods=['post'], url_path='library/batch', permission_classes=[permissions.IsAuthenticated])
+    def library_batch(self, request):
+        # Many favorite / unfavorite / progress changes in one request and one transaction
+        serializer = LibraryBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = apply_batch(request.user, 'googlebooks', serializer.validated_data['items'])
+        return Response({'results': results})
+
     @action(detail=False, methods=['get'])
     def favorites(self, request):
-        favorites = GoogleBookFavorite.objects.filter(user=request.user)
-        serializer = GoogleBookFavoriteSerializer(favorites, many=True, context={'request': request})
-        return Response(serializer.data)
+        favorites = GoogleBookFavorite.objects.filter(user=request.user).select_related('book')
+        paginator = CreatedAtCursorPagination()
+        page = paginator.paginate_queryset(favorites, request, view=self)
+        serializer = GoogleBookFavoriteSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def reading_history(self, request):
-        history = GoogleBookReadingHistory.objects.filter(user=request.user)
-        serializer = GoogleBookReadingHistorySerializer(history, many=True, context={'request': request})
-        return Response(serializer.data)
\ No newline at end of file
+        history = GoogleBookReadingHistory.objects.filter(user=request.user).select_related('book')
+        paginator = LastReadCursorPagination()
+        page = paginator.paginate_queryset(history, request, view=self)
+        serializer = GoogleBookReadingHistorySerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
\ No newline at end of file
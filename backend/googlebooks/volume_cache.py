@@ -0,0 +1,138 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .client import get_client
+from .guard import UpstreamUnavailable, get_upstream_guard
+from .ingest import ingest_volumes
+from .models import GoogleBook, GoogleVolumeCache
+from .singleflight import get_single_flight
+
+logger = logging.getLogger(__name__)
+
+# Defaults for settings.GOOGLE_BOOKS_VOLUME_CACHE
+DEFAULT_VOLUME_CACHE = {
+    'FRESH_TTL': 60 * 60 * 6,  # Served as is
+    'STALE_TTL': 60 * 60 * 24 * 7,  # Served while a background revalidation runs
+    'REVALIDATE_WORKERS': 2,
+}
+
+
+class VolumeCache:
+    """Persistent cache of raw upstream volume JSON with stale-while-revalidate.
+
+    Fresh entries are served directly. Stale entries are served immediately
+    while a background thread revalidates them with ``If-None-Match``; a 304
+    only bumps ``fetched_at``, a 200 replaces the payload and refreshes the
+    catalog row. Entries past the stale window are refetched synchronously,
+    and still served if the upstream guard refuses that refetch.
+    """
+
+    def __init__(self, fresh_ttl, stale_ttl, workers):
+        self.fresh_ttl = timedelta(seconds=fresh_ttl)
+        self.stale_ttl = timedelta(seconds=stale_ttl)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='volume-revalidate')
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        config = {**DEFAULT_VOLUME_CACHE, **getattr(settings, 'GOOGLE_BOOKS_VOLUME_CACHE', {})}
+        return cls(config['FRESH_TTL'], config['STALE_TTL'], config['REVALIDATE_WORKERS'])
+
+    def get(self, volume_id):
+        """Cached payload, or None when missing or too old to serve."""
+        entry = GoogleVolumeCache.objects.filter(google_books_id=volume_id).first()
+        if entry is None:
+            return None
+        age = timezone.now() - entry.fetched_at
+        if age > self.stale_ttl:
+            return None
+        if age > self.fresh_ttl:
+            self.schedule_revalidation(volume_id, entry.etag)
+        return entry.payload
+
+    def peek(self, volume_id):
+        """Cached payload regardless of age, or None."""
+        return GoogleVolumeCache.objects.filter(google_books_id=volume_id).values_list('payload', flat=True).first()
+
+    def get_or_fetch(self, volume_id):
+        payload = self.get(volume_id)
+        if payload is None:
+            try:
+                payload = get_single_flight().do(f'volume-detail:{volume_id}', lambda: self.fetch(volume_id))
+            except UpstreamUnavailable:
+                # Serve an expired entry rather than nothing while Google is unreachable
+                payload = self.peek(volume_id)
+                if payload is None:
+                    raise
+        return payload
+
+    def fetch(self, volume_id):
+        response = get_client().volume_conditional(volume_id)
+        self.store(volume_id, response.payload, response.etag)
+        return response.payload
+
+    def store(self, volume_id, payload, etag=''):
+        GoogleVolumeCache.objects.update_or_create(
+            google_books_id=volume_id,
+            defaults={'payload': payload, 'etag': etag or '', 'fetched_at': timezone.now()},
+        )
+
+    def revalidate_if_stale(self, volume_id, fetched_at):
+        """For rows served from the catalog: refresh them in the background once stale.
+
+        ``fetched_at`` is the row's own timestamp, so fresh rows cost no query.
+        Rows never fetched from upstream are left to the refresh_catalog worker.
+        """
+        if fetched_at is None or timezone.now() - fetched_at <= self.fresh_ttl:
+            return
+        etag = GoogleVolumeCache.objects.filter(google_books_id=volume_id).values_list('etag', flat=True).first()
+        self.schedule_revalidation(volume_id, etag or '')
+
+    def schedule_revalidation(self, volume_id, etag):
+        if get_upstream_guard().is_open():
+            return
+        with self._lock:
+            if volume_id in self._pending:
+                return
+            self._pending.add(volume_id)
+        self._executor.submit(self._revalidate, volume_id, etag)
+
+    def revalidate(self, volume_id, etag=''):
+        """Conditional refetch; returns True when the upstream reported no change."""
+        response = get_client().volume_conditional(volume_id, etag=etag)
+        if response.not_modified:
+            GoogleVolumeCache.objects.filter(google_books_id=volume_id).update(fetched_at=timezone.now())
+        else:
+            self.store(volume_id, response.payload, response.etag)
+            if response.payload.get('volumeInfo'):
+                ingest_volumes([{**response.payload, 'id': volume_id}])
+        # The catalog row is fresh now too, changed or not, so retrieve stops revalidating it
+        GoogleBook.objects.filter(google_books_id=volume_id).update(fetched_at=timezone.now())
+        return response.not_modified
+
+    def _revalidate(self, volume_id, etag):
+        try:
+            self.revalidate(volume_id, etag)
+        except Exception as err:
+            logger.warning(f'Background revalidation of volume {volume_id} failed: {err}')
+        finally:
+            with self._lock:
+                self._pending.discard(volume_id)
+            close_old_connections()
+
+
+_volume_cache = None
+
+
+def get_volume_cache():
+    global _volume_cache
+    if _volume_cache is None:
+        _volume_cache = VolumeCache.from_settings()
+    return _volume_cache
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+class SubscriptionsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'subscriptions'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,130 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from .models import SubscriptionTier, UserSubscription
+from .serializers import SubscriptionTierSerializer, UserSubscriptionSerializer
+
+# Defaults for settings.SUBSCRIPTION_ENTITLEMENTS
+DEFAULT_ENTITLEMENTS = {
+    'CACHE_ALIAS': 'default',  # Shared layer; use a cache all workers see
+    'TTL': 60 * 15,
+    'LOCAL_TTL': 5,  # In-process layer; bounds how long another worker's change can go unseen
+    'LOCAL_MAX_ENTRIES': 10000,
+    'KEY_PREFIX': 'subscriptions:entitlement',
+}
+
+
+class EntitlementService:
+    """Cached answer to "what is this user's active subscription?".
+
+    Returns the same payload as ``/subscriptions/current/`` (subscription
+    fields plus ``tier_details``), or None. Lookups go through a short-lived
+    in-process dict, then the shared cache, then one query. Users and tiers
+    are cached separately so a tier edit invalidates a single key; both are
+    dropped by the signals in subscriptions/signals.py whenever a
+    subscription or tier is saved or deleted.
+    """
+
+    def __init__(self, cache_alias, ttl, local_ttl, local_max_entries=DEFAULT_ENTITLEMENTS['LOCAL_MAX_ENTRIES'],
+                 key_prefix=DEFAULT_ENTITLEMENTS['KEY_PREFIX']):
+        self.cache_alias = cache_alias
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.local_max_entries = local_max_entries
+        self.key_prefix = key_prefix
+        self._local = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        config = {**DEFAULT_ENTITLEMENTS, **getattr(settings, 'SUBSCRIPTION_ENTITLEMENTS', {})}
+        return cls(config['CACHE_ALIAS'], config['TTL'], config['LOCAL_TTL'], config['LOCAL_MAX_ENTRIES'],
+                   config['KEY_PREFIX'])
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def user_key(self, user_id):
+        return f'{self.key_prefix}:user:{user_id}'
+
+    def tier_key(self, tier_id):
+        return f'{self.key_prefix}:tier:{tier_id}'
+
+    def for_user(self, user):
+        if not user.is_authenticated:
+            return None
+        entry = self._get(self.user_key(user.pk), lambda: self._load_user(user.pk))
+        if entry['subscription'] is None or entry['expires_at'] <= timezone.now():
+            return None
+        tier = self._get(self.tier_key(entry['tier_id']), lambda: self._load_tier(entry['tier_id']))
+        return {**entry['subscription'], 'tier_details': tier}
+
+    def active_tier(self, user):
+        """``(tier_id, expires_at)`` of the user's active subscription, or ``(None, None)``."""
+        entry = self._get(self.user_key(user.pk), lambda: self._load_user(user.pk))
+        if entry['subscription'] is None or entry['expires_at'] <= timezone.now():
+            return None, None
+        return entry['tier_id'], entry['expires_at']
+
+    def invalidate(self, user_id):
+        self._delete(self.user_key(user_id))
+
+    def invalidate_tier(self, tier_id):
+        self._delete(self.tier_key(tier_id))
+
+    def _get(self, key, load):
+        now = time.monotonic()
+        with self._lock:
+            cached = self._local.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+        value = self.cache.get(key)
+        if value is None:
+            value, ttl = load()
+            if ttl > 0:
+                self.cache.set(key, value, ttl)
+        with self._lock:
+            if len(self._local) >= self.local_max_entries:
+                self._local.clear()
+            self._local[key] = (now + self.local_ttl, value)
+        return value
+
+    def _delete(self, key):
+        with self._lock:
+            self._local.pop(key, None)
+        self.cache.delete(key)
+
+    def _load_user(self, user_id):
+        subscription = (
+            UserSubscription.objects.filter(user_id=user_id, is_active=True, end_date__gt=timezone.now())
+            .order_by('-end_date')
+            .first()
+        )
+        if subscription is None:
+            return {'subscription': None, 'tier_id': None, 'expires_at': None}, self.ttl
+        data = dict(UserSubscriptionSerializer(subscription).data)
+        data.pop('tier_details')
+        entry = {'subscription': data, 'tier_id': subscription.tier_id, 'expires_at': subscription.end_date}
+        # Never cache an entitlement past its expiry
+        remaining = (subscription.end_date - timezone.now()).total_seconds()
+        return entry, int(min(self.ttl, remaining))
+
+    def _load_tier(self, tier_id):
+        tier = SubscriptionTier.objects.filter(pk=tier_id).first()
+        return (SubscriptionTierSerializer(tier).data if tier else None), self.ttl
+
+
+_entitlements = None
+
+
+def get_entitlements():
+    global _entitlements
+    if _entitlements is None:
+        _entitlements = EntitlementService.from_settings()
+    return _entitlements
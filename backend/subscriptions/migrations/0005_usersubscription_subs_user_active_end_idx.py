@@ -0,0 +1,19 @@
+# Generated by Django 4.2.19 on 2026-10-18 13:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('subscriptions', '0004_remove_subscriptiontier_max_books_per_month_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usersubscription',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['user', '-end_date'], name='subs_user_active_end_idx'),
+        ),
+    ]
@@ -39,6 +39,14 @@ class UserSubscription(models.Model):
     end_date = models.DateTimeField()
     is_active = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            # Active subscription lookup: user, is_active=True, end_date > now, latest end first.
+            # Partial, since the bare boolean predicate can't match an index column on SQLite
+            models.Index(fields=['user', '-end_date'], condition=models.Q(is_active=True),
+                         name='subs_user_active_end_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.end_date:
             if self.tier.duration == '7D':
@@ -0,0 +1,17 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .entitlements import get_entitlements
+from .models import SubscriptionTier, UserSubscription
+
+
+@receiver([post_save, post_delete], sender=UserSubscription)
+def invalidate_user_entitlement(sender, instance, **kwargs):
+    # After commit, so a concurrent read can't re-cache the old row
+    transaction.on_commit(lambda: get_entitlements().invalidate(instance.user_id))
+
+
+@receiver([post_save, post_delete], sender=SubscriptionTier)
+def invalidate_tier_entitlement(sender, instance, **kwargs):
+    transaction.on_commit(lambda: get_entitlements().invalidate_tier(instance.pk))
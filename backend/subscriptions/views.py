@@ -3,6 +3,7 @@ from rest_framework.views import APIView
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import SubscriptionTier, UserSubscription
+from .entitlements import get_entitlements
 from .serializers import SubscriptionTierSerializer, UserSubscriptionSerializer
 from django.utils import timezone
 from django.conf import settings
@@ -18,9 +19,11 @@ class SubscriptionTierViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = SubscriptionTier.objects.all()
     serializer_class = SubscriptionTierSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None  # Small fixed table, the frontend expects a plain list
 
 class PaymentAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    requires_user_row = True  # GET completes the payment and saves the user
 
     def post(self, request):
         user = request.user
@@ -109,15 +112,9 @@ class UserSubscriptionViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def current(self, request):
-        try:
-            subscription = UserSubscription.objects.get(
-                user=request.user,
-                is_active=True,
-                end_date__gt=timezone.now()
-            )
-            serializer = self.get_serializer(subscription)
-            return Response(serializer.data)
-        except UserSubscription.DoesNotExist:
+        # Served from the entitlement cache; invalidated whenever a subscription changes
+        subscription = get_entitlements().for_user(request.user)
+        if subscription is None:
             return Response(
                 {
                     "detail": "No active subscription found.",
@@ -126,6 +123,7 @@ class UserSubscriptionViewSet(viewsets.ModelViewSet):
                 },
                 status=status.HTTP_404_NOT_FOUND
             )
+        return Response(subscription)
 
     @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def upgrade(self, request):
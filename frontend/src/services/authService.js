@@ -9,6 +9,9 @@ const axiosInstance = axios.create({
   }
 });
 
+// In-flight token refresh, shared by requests that fail with 401 at the same time
+let refreshRequest = null;
+
 const authService = {
   setSession: (data) => {
     if (data.access) {
@@ -134,15 +137,23 @@ const authService = {
           originalRequest._retry = true;
 
           try {
-            const refreshToken = localStorage.getItem('refreshToken');
-            if (!refreshToken) {
-              throw new Error('No refresh token available');
+            // Refresh tokens are single-use, so concurrent 401s share one refresh
+            if (!refreshRequest) {
+              const refreshToken = localStorage.getItem('refreshToken');
+              if (!refreshToken) {
+                throw new Error('No refresh token available');
+              }
+              refreshRequest = axios.post(`${API_URL}/token/refresh/`, {
+                refresh: refreshToken
+              }).finally(() => {
+                refreshRequest = null;
+              });
             }
+            const response = await refreshRequest;
 
-            const response = await axios.post(`${API_URL}/token/refresh/`, {
-              refresh: refreshToken
-            });
-
+            if (response.data.refresh) {
+              localStorage.setItem('refreshToken', response.data.refresh);
+            }
             if (response.data.access) {
               localStorage.setItem('token', response.data.access);
               axiosInstance.defaults.headers.common['Authorization'] = `Bearer ${response.data.access}`;
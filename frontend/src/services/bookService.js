@@ -56,12 +56,14 @@ class BookService {
   async getBookDetails(bookId) {
     try {
 
-      // Get book details from our backend Google Books API
-      const response = await axiosInstance.get(`/googlebooks/${bookId}/`);
-      const bookData = response.data;
+      // Get book details from our backend Google Books API, with the active subscription embedded
+      const response = await axiosInstance.get(`/googlebooks/${bookId}/`, { params: { include: 'entitlement' } });
+      const { entitlement, ...bookData } = response.data;
       
-      // Check subscription access
-      const subscription = await subscriptionService.getCurrentSubscription();
+      // Check subscription access; no entitlement means the FREE tier, as with a 404 from /subscriptions/current/
+      const subscription = entitlement === undefined
+        ? await subscriptionService.getCurrentSubscription()
+        : entitlement || { tier: SubscriptionTiers.FREE, tier_details: SubscriptionFeatures[SubscriptionTiers.FREE] };
       const canAccessPremiumBooks = subscriptionService.checkFeatureAccess(subscription.tier, 'canAccessPremiumBooks');
       
       if (bookData.isPremium && !canAccessPremiumBooks) {